@@ -7,7 +7,9 @@ from .config import (
 
 from .cleanup import kill_zombie_chrome
 from .network_utils import wait_for_connection
-from .downloader import download_manhwa
+from .downloader import enqueue_manhwa, run_chapter_job, QUEUE_SOURCE
+from .browser_pool import BrowserPool
+from .browser_utils import start_browser, start_harvest_browser
 
 __all__ = [
     "load_manhwa_list",
@@ -16,5 +18,10 @@ __all__ = [
     "CHECK_URL",
     "kill_zombie_chrome",
     "wait_for_connection",
-    "download_manhwa",
+    "enqueue_manhwa",
+    "run_chapter_job",
+    "QUEUE_SOURCE",
+    "BrowserPool",
+    "start_browser",
+    "start_harvest_browser",
 ]
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Callable, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from functions.common.browser_supervisor import quit_chrome
+
+from .browser_utils import start_browser
+
+
+class BrowserPool:
+    """Keep up to *size* warm Chrome drivers and lease them out per chapter.
+
+    A driver is reset (cookies, storage, ``about:blank``) when it comes back,
+    and thrown away after *max_uses* leases or as soon as it looks crashed.
+    ``factory`` / ``dispose`` let scripts plug in their own ``start_browser``.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_uses: int = 25,
+        factory: Callable[[], webdriver.Chrome] = start_browser,
+        dispose: Callable[[webdriver.Chrome], None] = quit_chrome,
+        page_load_timeout: int = 60,
+        script_timeout: int = 30,
+    ) -> None:
+        self.size              = size
+        self.max_uses          = max_uses
+        self.factory           = factory
+        self.dispose           = dispose
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout    = script_timeout
+
+        self._idle: list[webdriver.Chrome] = []
+        self._uses: dict[int, int] = {}
+        self._lock  = threading.Lock()
+        self._slots = threading.Semaphore(size)
+
+        self.stats = {
+            "leases": 0, "launched": 0, "recycled": 0, "crashed": 0,
+            "wait_total": 0.0, "wait_max": 0.0, "lease_total": 0.0,
+        }
+
+    # ── driver lifecycle ──────────────────────────────────────────────────────
+    def _launch(self) -> webdriver.Chrome:
+        driver = self.factory()
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.set_script_timeout(self.script_timeout)
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self.stats["launched"] += 1
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            self.dispose(driver)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _reset(driver: webdriver.Chrome) -> None:
+        driver.delete_all_cookies()
+        driver.execute_script(
+            "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+        )
+        driver.get("about:blank")
+
+    def warm(self) -> None:
+        """Start every driver up front instead of on first lease."""
+        with self._lock:
+            missing = self.size - len(self._idle) - len(self._uses)
+        for _ in range(max(missing, 0)):
+            driver = self._launch()
+            with self._lock:
+                self._idle.append(driver)
+
+    # ── leasing ───────────────────────────────────────────────────────────────
+    @contextmanager
+    def lease(self) -> Iterator[webdriver.Chrome]:
+        t0 = monotonic()
+        self._slots.acquire()
+        waited = monotonic() - t0
+
+        driver = None
+        crashed = False
+        try:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                driver = self._launch()
+
+            with self._lock:
+                self._uses[id(driver)] += 1
+                self.stats["leases"] += 1
+                self.stats["wait_total"] += waited
+                self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+
+            t1 = monotonic()
+            try:
+                yield driver
+            except TimeoutException:
+                raise
+            except WebDriverException:
+                crashed = True
+                raise
+            finally:
+                with self._lock:
+                    self.stats["lease_total"] += monotonic() - t1
+        finally:
+            if driver is not None:
+                self._release(driver, crashed)
+            self._slots.release()
+
+    def _release(self, driver: webdriver.Chrome, crashed: bool) -> None:
+        reason = "crashed" if crashed else None
+        if reason is None and self._uses.get(id(driver), 0) >= self.max_uses:
+            reason = "recycled"
+        if reason is None:
+            try:
+                self._reset(driver)
+            except Exception:
+                reason = "crashed"
+
+        if reason is None:
+            with self._lock:
+                self._idle.append(driver)
+            return
+        with self._lock:
+            self.stats[reason] += 1
+        self._discard(driver)
+
+    # ── shutdown / reporting ──────────────────────────────────────────────────
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def report(self) -> str:
+        s = self.stats
+        leases = s["leases"] or 1
+        return (
+            f"🧭  Browser pool: {s['leases']} leases, {s['launched']} launches, "
+            f"{s['recycled']} recycled, {s['crashed']} crashed | "
+            f"wait avg {s['wait_total'] / leases:.2f} s (max {s['wait_max']:.2f} s), "
+            f"lease avg {s['lease_total'] / leases:.2f} s"
+        )
@@ -1,6 +1,10 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
+from functions.common.browser_supervisor import start_chrome
+from functions.common.network_capture import enable_capture
+from functions.common.url_harvest import enable_harvest
+
 def _chrome_options() -> Options:
     opts = Options()
     opts.add_argument("--headless")
@@ -12,6 +16,21 @@ def _chrome_options() -> Options:
     return opts
 
 
-def start_browser() -> webdriver.Chrome:
-    """Return a ready‑to‑use headless Chrome driver."""
-    return webdriver.Chrome(options=_chrome_options())
+def start_browser(capture: bool = False, harvest: bool = False) -> webdriver.Chrome:
+    """Return a ready‑to‑use headless Chrome driver.
+
+    With *capture*, DevTools network events are logged so image bodies can be
+    read back via ``network_capture.capture_image_bodies``. With *harvest*,
+    images, media, fonts and ad hosts are blocked – for pages where only the
+    URLs in the DOM are needed.
+    """
+    opts = _chrome_options()
+    if capture:
+        enable_capture(opts)
+    driver = start_chrome(opts)
+    return enable_harvest(driver) if harvest else driver
+
+
+def start_harvest_browser() -> webdriver.Chrome:
+    """Zero-argument factory for a URL-harvest driver (``BrowserPool``)."""
+    return start_browser(harvest=True)
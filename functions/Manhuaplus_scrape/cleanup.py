@@ -1,13 +1,10 @@
-import os
+from functions.common.browser_supervisor import supervisor
 
-_KILL_PATTERNS = [
-    "chrome",
-    "chromedriver",
-    "chromium",
-    "HeadlessChrome",
-    "selenium",
-]
 
 def kill_zombie_chrome() -> None:
-    for pat in _KILL_PATTERNS:
-        os.system(f"pkill -f {pat}")
+    """Reap Chrome left behind by crashed runs.
+
+    Only process groups registered by runs that are no longer alive are
+    killed, so other scrapers running on this host keep their browsers.
+    """
+    supervisor.reap_orphans()
@@ -2,113 +2,117 @@ from __future__ import annotations
 
 import os
 import shutil
-from time import sleep
-from typing import List
 
-import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from .browser_utils import start_browser
+from .browser_pool  import BrowserPool
 from .site_utils     import get_latest_chapter
 from .config         import PICTURES_BASE
 
+from functions.common.image_downloader import ImageDownloader
+from functions.common.job_queue import Job, JobQueue
+from functions.common.retry import RetryPolicy, circuit_open, host_of
+from functions.common.library_index import open_library
 
-def _save_image(url: str, folder: str, index: int) -> None:
-    ext = url.split(".")[-1].split("?")[0]
-    name = f"{index:03d}.{ext}"
-    path = os.path.join(folder, name)
-    content = requests.get(url, headers={"User-Agent": "Mozilla/5.0"},
-                           timeout=10).content
-    with open(path, "wb") as f:
-        f.write(content)
-    sleep(0.3)  # light throttle to be polite
+QUEUE_SOURCE = "manhuaplus"
 
 
-def download_manhwa(
-    manhwa: dict,
-    log_folder: str,
+def download_chapter(
+    name: str,
+    base_url: str,
+    chap: int,
+    downloader: ImageDownloader,
+    pool: BrowserPool,
     max_retries: int = 5,
-) -> List[str]:
+) -> bool:
+    """Download one chapter into ``PICTURES_BASE/name/chapter-N``.
+
+    Returns ``True`` on success; a failed chapter leaves no folder behind.
+    :class:`~functions.common.retry.CircuitOpen` is re-raised after the
+    cleanup, so the queue defers the chapter instead of failing it.
+    """
+    chap_dir = os.path.join(PICTURES_BASE, name, f"chapter-{chap}")
+    chap_url = f"{base_url}/chapter-{chap}"
+
+    print(f"📅  Downloading {name} Chapter {chap} …")
+
+    def attempt() -> None:
+        with pool.lease() as driver:
+            driver.get(chap_url)
+            WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "a.readImg"))
+            )
+            links  = driver.find_elements(By.CSS_SELECTOR, "a.readImg")
+            images = [a.get_attribute("href") for a in links if a.get_attribute("href")]
+
+        if not images:
+            raise RuntimeError("No images found on page")
+
+        downloader.download_chapter(images, chap_dir)
+
+        with open(os.path.join(chap_dir, "source.txt"), "w") as f:
+            f.write("Downloaded from ManhuaPlus")
+
+    paused = None
+    try:
+        RetryPolicy(attempts=max_retries, base=2).call(attempt, host=host_of(chap_url))
+        success = True
+    except Exception as exc:
+        paused = circuit_open(exc)
+        if paused is not None:
+            print(f"⏸️  Chapter {chap} deferred: {exc}")
+        else:
+            print(f"❌  Chapter {chap} failed: {exc}")
+        success = False
 
-    name      = manhwa["name"]
-    base_url  = manhwa["url"]
-    url_fmt   = f"{base_url}/chapter-{{}}"
-    target_dir = os.path.join(PICTURES_BASE, name)
-    os.makedirs(target_dir, exist_ok=True)
+    # ------- post‑retry cleanup -----------------------------------
+    if not success and os.path.exists(chap_dir):
+        print(f"🧹  Removing failed folder: {chap_dir}")
+        shutil.rmtree(chap_dir, ignore_errors=True)
 
-    last_chapter = get_latest_chapter(base_url)
-    log_lines: list[str] = []
-    errors:    list[str] = []
+    open_library(PICTURES_BASE).update_chapter(name, chap)
+    if paused is not None:
+        raise paused
+    return success
 
-    print(f"\n📚  Processing: {name}   (latest = {last_chapter})")
 
-    # ------------------------------------------------------------------
-    for chap in range(1, last_chapter + 1):
-        chap_dir  = os.path.join(target_dir, f"chapter-{chap}")
-        chap_url  = url_fmt.format(chap)
+# ── queue mode ────────────────────────────────────────────────────────────────
+def enqueue_manhwa(manhwa: dict, queue: JobQueue, log_folder: str) -> int:
+    """Queue every missing chapter of *manhwa*; returns how many were queued.
 
-        if os.path.exists(chap_dir):
-            print(f"⏭️  Chapter {chap} exists  ➜  skip")
-            log_lines.append(f"[Chapter {chap}] Skipped (already there)")
-            continue
+    Starts the per-title log that the workers append to.
+    """
+    name     = manhwa["name"]
+    base_url = manhwa["url"]
+    os.makedirs(os.path.join(PICTURES_BASE, name), exist_ok=True)
 
-        print(f"📅  Downloading Chapter {chap} …")
-        success = False
+    existing     = open_library(PICTURES_BASE).chapter_numbers(name)
+    last_chapter = get_latest_chapter(base_url, known=max(existing, default=0))
+    missing      = [c for c in range(1, last_chapter + 1) if c not in existing]
+
+    for chap in missing:
+        queue.enqueue(name, QUEUE_SOURCE, chap, {"url": base_url})
 
-        for attempt in range(1, max_retries + 5):
-            driver = None
-            try:
-                driver = start_browser()
-                driver.set_page_load_timeout(60)
-                driver.set_script_timeout(30)
-
-                driver.get(chap_url)
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a.readImg"))
-                )
-                links  = driver.find_elements(By.CSS_SELECTOR, "a.readImg")
-                images = [a.get_attribute("href") for a in links if a.get_attribute("href")]
-
-                if not images:
-                    raise RuntimeError("No images found on page")
-
-                os.makedirs(chap_dir, exist_ok=True)
-                for idx, src in enumerate(images, start=1):
-                    _save_image(src, chap_dir, idx)
-
-                with open(os.path.join(chap_dir, "source.txt"), "w") as f:
-                    f.write("Downloaded from ManhuaPlus")
-
-                log_lines.append(f"[Chapter {chap}] ✅ Done")
-                success = True
-                break  # break retry‑loop
-
-            except Exception as exc:
-                print(f"❌  Attempt {attempt}/{max_retries} failed: {exc}")
-                sleep(3)
-
-            finally:
-                if driver:
-                    try:
-                        driver.quit()
-                    except Exception:
-                        pass
-
-        # ------- post‑retry cleanup -----------------------------------
-        if not success:
-            errors.append(f"{name} Chapter {chap}: failed after retries")
-            log_lines.append(f"[Chapter {chap}] ❌ Failed")
-            if os.path.exists(chap_dir):
-                print(f"🧹  Removing failed folder: {chap_dir}")
-                shutil.rmtree(chap_dir, ignore_errors=True)
-
-    # ------- write per‑title log --------------------------------------
-    log_path = os.path.join(log_folder, f"{name}.txt")
-    with open(log_path, "w", encoding="utf‑8") as fp:
+    print(f"📚  {name}: latest = {last_chapter}, queued {len(missing)}")
+    with open(os.path.join(log_folder, f"{name}.txt"), "w", encoding="utf‑8") as fp:
         fp.write(f"📚 Log for: {name}\n\n")
-        fp.write("\n".join(log_lines))
+        fp.write(f"Skipped {last_chapter - len(missing)} chapters (already there)\n")
+    return len(missing)
 
-    print(f"📝  Log saved ➜  {log_path}")
-    return errors
+
+def run_chapter_job(
+    job: Job,
+    log_folder: str,
+    downloader: ImageDownloader,
+    pool: BrowserPool,
+    max_retries: int = 5,
+) -> None:
+    """Queue worker body: raise so the queue records the failure."""
+    ok = download_chapter(job.series, job.payload["url"], job.chapter,
+                          downloader, pool, max_retries)
+    with open(os.path.join(log_folder, f"{job.series}.txt"), "a", encoding="utf‑8") as fp:
+        fp.write(f"[Chapter {job.chapter}] {'✅ Done' if ok else '❌ Failed'}\n")
+    if not ok:
+        raise RuntimeError("failed after retries")
@@ -1,13 +1,15 @@
-import requests
-from time import sleep
+from functions.common.site_health import GRACE, SiteHealth
 
-def wait_for_connection(url: str, retry_sec: int = 20) -> None:
-    while True:
-        try:
-            if requests.get(url, timeout=10).status_code == 200:
-                print("✅  Website is reachable.")
-                return
-        except Exception:
-            pass
-        print(f"❌  Can't connect to {url}.  Retrying in {retry_sec//0.2} min…")
-        sleep(retry_sec)
+
+def wait_for_connection(url: str, max_wait: float = GRACE) -> bool:
+    """Wait at most *max_wait* s for *url* to answer.
+
+    Returns ``False`` when it stayed down, so the caller can defer its work
+    to the next run instead of blocking the pipeline.
+    """
+    with SiteHealth({url: [url]}) as health:
+        if health.wait_until_up(url, max_wait):
+            print("✅  Website is reachable.")
+            return True
+    print(f"⏸️  {url} still down after {max_wait:.0f} s – deferring.")
+    return False
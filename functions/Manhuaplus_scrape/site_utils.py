@@ -1,21 +1,18 @@
 import requests
-from bs4 import BeautifulSoup
 
-def get_latest_chapter(base_url: str) -> int:
-    try:
-        resp = requests.get(base_url,
-                            headers={"User-Agent": "Mozilla/5.0"},
-                            timeout=10)
-        soup  = BeautifulSoup(resp.text, "html.parser")
-        nums  = []
+from functions.common.latest_chapter import resolve_latest, url_exists
+from functions.searchNewChapters.site_lookups import manhuaplus_latest
 
-        for a in soup.select("a[href*='/chapter-']"):
-            href  = a.get("href", "")
-            part  = href.split("/chapter-")[-1].split("/")[0]
-            if part.isdigit():
-                nums.append(int(part))
+_session = requests.Session()
 
-        return max(nums) if nums else 1
-    except Exception as exc:
-        print(f"❌ get_latest_chapter error: {exc}")
-        return 1
+
+def get_latest_chapter(base_url: str, known: int = 0) -> int:
+    """Newest chapter of a series (0 if none could be found).
+
+    Gallops upward from *known* with HEAD probes of ``/chapter-N``, bounded
+    by the series page's latest-chapter button.
+    """
+    slug   = base_url.rstrip("/").rsplit("/", 1)[-1]
+    listed = manhuaplus_latest(slug, {"url": base_url})
+    return resolve_latest(slug, lambda n: url_exists(_session, f"{base_url}/chapter-{n}"),
+                          known, listed)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import signal
+import socket
+import threading
+from time import monotonic, sleep, time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from .config import DATA_DIR
+from .job_queue import pid_alive
+
+REGISTRY_DIR = os.path.join(DATA_DIR, "browsers")
+TERM_GRACE   = 3.0      # seconds between SIGTERM and SIGKILL
+
+# process names a reaped group may contain (comm is truncated to 15 chars)
+CHROME_NAMES = ("chrome", "chromedriver", "chromium", "chromium-browse", "headless_shell")
+
+
+# ── /proc helpers ─────────────────────────────────────────────────────────────
+def _stat(pid: int) -> list[str] | None:
+    """Fields of ``/proc/<pid>/stat`` after the command name (state is [0])."""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+
+
+def _start_time(pid: int) -> int | None:
+    fields = _stat(pid)
+    return int(fields[19]) if fields else None
+
+
+def _comm(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _members(pgid: int) -> list[int]:
+    """Live (non-zombie) processes in process group *pgid*."""
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        fields = _stat(int(entry))
+        if fields and fields[0] != "Z" and int(fields[2]) == pgid:
+            found.append(int(entry))
+    return found
+
+
+def _owned(pgid: int, started: int) -> bool:
+    """Is *pgid* still the group we launched?
+
+    While the leader lives its start time must match (pids get reused).
+    Once it is gone the group id cannot be handed out again while members
+    remain, so any Chrome left in it is ours.
+    """
+    leader_started = _start_time(pgid)
+    if leader_started is not None:
+        return leader_started == started
+    return any(_comm(p).startswith(CHROME_NAMES) for p in _members(pgid))
+
+
+def _kill_group(pgid: int, grace: float = TERM_GRACE) -> bool:
+    """SIGTERM the group, SIGKILL whatever is left after *grace*; True if any was alive."""
+    if not _members(pgid):
+        return False
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return False
+    deadline = monotonic() + grace
+    while monotonic() < deadline and _members(pgid):
+        sleep(0.1)
+    if _members(pgid):
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    return True
+
+
+def _exit_on_term(*_args) -> None:
+    raise SystemExit(143)     # runs atexit, so the browsers get reaped
+
+
+# ── supervisor ────────────────────────────────────────────────────────────────
+class BrowserSupervisor:
+    """Start Chrome in process groups this run owns, and reap only those.
+
+    Every chromedriver is started in a new session, so it and the Chrome
+    processes it spawns share one process group. The groups are listed in
+    a per-process registry file (``<host>-<pid>.json``). On normal exit or
+    SIGTERM the run kills its own groups; groups of runs that died without
+    cleaning up are reaped by the next run via :meth:`reap_orphans`.
+    Browsers of other scrapers that are still running are never touched.
+    """
+
+    def __init__(self, registry_dir: str = REGISTRY_DIR) -> None:
+        self.registry_dir = registry_dir
+        self._groups: dict[int, int] = {}     # pgid → leader start time
+        self._lock      = threading.Lock()
+        self._installed = False
+        os.register_at_fork(after_in_child=self._forget)
+
+    # -- registry --------------------------------------------------------------
+    def _path(self, pid: int | None = None) -> str:
+        return os.path.join(self.registry_dir,
+                            f"{socket.gethostname()}-{pid or os.getpid()}.json")
+
+    def _save(self) -> None:
+        path = self._path()
+        if not self._groups:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return
+        os.makedirs(self.registry_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "updated": time(),
+                       "groups": [[g, s] for g, s in self._groups.items()]}, f)
+        os.replace(tmp, path)
+
+    def _forget(self) -> None:
+        # a forked worker owns none of its parent's browsers
+        self._groups    = {}
+        self._lock      = threading.Lock()
+        self._installed = False
+
+    def _install(self) -> None:
+        if self._installed:
+            return
+        self._installed = True
+        atexit.register(self.shutdown)
+        if (threading.current_thread() is threading.main_thread()
+                and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL):
+            signal.signal(signal.SIGTERM, _exit_on_term)
+
+    # -- launching -------------------------------------------------------------
+    def chrome(self, options) -> webdriver.Chrome:
+        """``webdriver.Chrome(options=…)`` whose processes this run owns."""
+        self._install()
+        service = Service(popen_kw={"start_new_session": True})
+        driver = webdriver.Chrome(options=options, service=service)
+        pgid = service.process.pid
+        started = _start_time(pgid)
+        with self._lock:
+            self._groups[pgid] = started or 0
+            self._save()
+        driver.supervisor_group = pgid
+        return driver
+
+    def release(self, pgid: int) -> None:
+        """Reap what is left of *pgid* (after ``quit()``) and unregister it."""
+        with self._lock:
+            started = self._groups.pop(pgid, None)
+            self._save()
+        if started is not None and _owned(pgid, started):
+            _kill_group(pgid, grace=0.5)
+
+    def quit(self, driver: webdriver.Chrome) -> None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        pgid = getattr(driver, "supervisor_group", None)
+        if pgid is not None:
+            self.release(pgid)
+
+    def shutdown(self) -> None:
+        """Kill every group this process still owns."""
+        with self._lock:
+            groups, self._groups = self._groups, {}
+            self._save()
+        killed = sum(_kill_group(g) for g, s in groups.items() if _owned(g, s))
+        if killed:
+            print(f"🧹  Reaped {killed} browser group(s) still running at exit")
+
+    # -- orphans ---------------------------------------------------------------
+    def reap_orphans(self) -> int:
+        """Kill browser groups of dead runs on this host; returns how many."""
+        prefix = f"{socket.gethostname()}-"
+        try:
+            names = os.listdir(self.registry_dir)
+        except FileNotFoundError:
+            return 0
+        reaped = 0
+        for name in names:
+            if not (name.startswith(prefix) and name.endswith(".json")):
+                continue
+            pid = name[len(prefix):-len(".json")]
+            if not pid.isdigit() or int(pid) == os.getpid() or pid_alive(int(pid)):
+                continue
+            path = os.path.join(self.registry_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    groups = json.load(f).get("groups", [])
+            except (OSError, ValueError):
+                groups = []
+            for pgid, started in groups:
+                if _owned(pgid, started) and _kill_group(pgid):
+                    reaped += 1
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        if reaped:
+            print(f"🧹  Reaped {reaped} browser group(s) left by crashed runs")
+        return reaped
+
+
+supervisor = BrowserSupervisor()
+
+
+def start_chrome(options) -> webdriver.Chrome:
+    """Drop-in for ``webdriver.Chrome(options=options)``; see :class:`BrowserSupervisor`."""
+    return supervisor.chrome(options)
+
+
+def quit_chrome(driver: webdriver.Chrome) -> None:
+    """``driver.quit()`` plus reaping of any Chrome process it left behind."""
+    supervisor.quit(driver)
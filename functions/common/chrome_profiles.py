@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from time import time
+
+from .config import DATA_DIR
+from .job_queue import pid_alive
+
+TEMPLATE_VERSION = 1          # bump when the prefs below change
+DISK_CACHE_BYTES = 64 << 20   # per clone – keeps tmpfs usage bounded
+PROFILE_BYTES    = 32 << 20   # a clone's own files on top of its cache
+CLONE_BUDGET     = DISK_CACHE_BYTES + PROFILE_BYTES
+SHM_MIN_CLONES   = 4          # tmpfs must fit this many clones to be used at all
+STALE_AFTER      = 24 * 3600  # clones of a live pid older than this are gone too
+
+# Skipped when building the template and when cloning it.
+_NOT_COPIED = shutil.ignore_patterns(
+    "Singleton*", "Cache", "Code Cache", "GPUCache", "GrShaderCache",
+    "ShaderCache", "Crashpad", "BrowserMetrics*", "*.tmp",
+)
+
+_PREFERENCES = {
+    "browser": {"check_default_browser": False, "has_seen_welcome_page": True},
+    "credentials_enable_service": False,
+    "profile": {
+        "password_manager_enabled": False,
+        "default_content_setting_values": {"notifications": 2, "geolocation": 2},
+    },
+    "translate": {"enabled": False},
+    "download": {"prompt_for_download": False},
+}
+
+# Flags every clone is started with on top of the caller's own.
+CLONE_ARGS = [
+    "--profile-directory=Default",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--password-store=basic",
+    "--use-mock-keychain",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-sync",
+    f"--disk-cache-size={DISK_CACHE_BYTES}",
+]
+
+
+def _free_bytes(path: str) -> int:
+    try:
+        st = os.statvfs(path)
+    except OSError:
+        return 0
+    return st.f_bavail * st.f_frsize
+
+
+def _disk_root() -> str:
+    return os.path.join(DATA_DIR, "chrome-profiles")
+
+
+def _default_root() -> str:
+    """tmpfs when the host has one with room for a few clones – profile I/O
+    then never touches the disk. Small mounts (Docker's 64 MB /dev/shm) are
+    RAM-backed and fill up fast, so they are skipped."""
+    shm = "/dev/shm"
+    if (os.path.isdir(shm) and os.access(shm, os.W_OK)
+            and _free_bytes(shm) >= SHM_MIN_CLONES * CLONE_BUDGET):
+        return os.path.join(shm, "manhwa-chrome")
+    return _disk_root()
+
+
+class ProfileManager:
+    """One warmed Chrome profile template, cloned per browser.
+
+    The template is built once per boot (Chrome's first-run work is done by
+    a throw-away launch, default-browser check, translate and password
+    manager are switched off) and every browser gets a plain copy of it.
+    Clones are named after the owning pid, so :meth:`gc` can remove the
+    ones left behind by crashed runs. A clone that would not fit into the
+    root's free space (a tmpfs shared by a pool of browsers) spills over to
+    the data directory instead.
+    """
+
+    def __init__(self, root: str | None = None, spill: str | None = None) -> None:
+        self.root     = root or _default_root()
+        self.spill    = spill or _disk_root()
+        self.template = os.path.join(self.root, f"template-v{TEMPLATE_VERSION}")
+        self._gc_done = False
+        self._spilled = False
+
+    # -- template --------------------------------------------------------------
+    def _ready(self) -> bool:
+        return os.path.exists(os.path.join(self.template, ".ready"))
+
+    def ensure_template(self) -> str:
+        if self._ready():
+            return self.template
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)     # another scraper may be building it
+            if not self._ready():
+                self._build()
+        return self.template
+
+    def _build(self) -> None:
+        tmp = f"{self.template}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(os.path.join(tmp, "Default"))
+        with open(os.path.join(tmp, "Default", "Preferences"), "w", encoding="utf-8") as f:
+            json.dump(_PREFERENCES, f)
+        open(os.path.join(tmp, "First Run"), "w").close()
+
+        try:
+            self._warm(tmp)
+        except Exception as exc:
+            # a prefs-only template still skips most of the first-run work
+            print(f"⚠️  Chrome template warm-up failed: {exc}")
+
+        for name in os.listdir(tmp):
+            if name.startswith("Singleton"):
+                os.unlink(os.path.join(tmp, name))
+        for junk in ("Cache", "Code Cache", "GPUCache"):
+            shutil.rmtree(os.path.join(tmp, "Default", junk), ignore_errors=True)
+        open(os.path.join(tmp, ".ready"), "w").close()
+
+        shutil.rmtree(self.template, ignore_errors=True)
+        os.replace(tmp, self.template)
+        print(f"🧰  Chrome profile template ready ➜  {self.template}")
+
+    @staticmethod
+    def _warm(path: str) -> None:
+        from selenium.webdriver.chrome.options import Options
+
+        from .browser_supervisor import quit_chrome, start_chrome
+
+        opts = Options()
+        for arg in ("--headless=new", "--no-sandbox", "--disable-gpu",
+                    "--disable-dev-shm-usage", f"--user-data-dir={path}", *CLONE_ARGS):
+            opts.add_argument(arg)
+        driver = start_chrome(opts)
+        try:
+            driver.get("about:blank")
+        finally:
+            quit_chrome(driver)
+
+    # -- clones ----------------------------------------------------------------
+    def clone(self) -> str:
+        """A fresh private copy of the template; pass it to :meth:`release`."""
+        template = self.ensure_template()
+        if not self._gc_done:
+            self._gc_done = True
+            self.gc()
+        root = self.root
+        if root != self.spill and _free_bytes(root) < CLONE_BUDGET:
+            if not self._spilled:
+                self._spilled = True
+                print(f"⚠️  {root} is nearly full – new Chrome profiles go to {self.spill}")
+            root = self.spill
+            os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, f"clone-{os.getpid()}-{uuid.uuid4().hex[:12]}")
+        shutil.copytree(template, path, symlinks=True, ignore=_NOT_COPIED)
+        return path
+
+    def chrome_args(self, profile_dir: str) -> list[str]:
+        return [f"--user-data-dir={profile_dir}", *CLONE_ARGS]
+
+    def release(self, profile_dir: str) -> None:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def gc(self, stale_after: float = STALE_AFTER) -> int:
+        """Remove clones whose owner died (or that are older than *stale_after*)."""
+        removed = 0
+        for root in dict.fromkeys((self.root, self.spill)):
+            try:
+                names = os.listdir(root)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                path = os.path.join(root, name)
+                if name.startswith("clone-"):
+                    pid = name.split("-")[1]
+                    try:
+                        age = time() - os.path.getmtime(path)
+                    except OSError:
+                        continue
+                    if pid.isdigit() and pid_alive(int(pid)) and age < stale_after:
+                        continue
+                elif name.startswith("template-") and root == self.root:
+                    if name == os.path.basename(self.template):
+                        continue
+                    if name.endswith(".tmp"):                # template-vN.<pid>.tmp
+                        pid = name.split(".")[-2]
+                        if pid.isdigit() and pid_alive(int(pid)):
+                            continue
+                else:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        if removed:
+            print(f"🧹  Removed {removed} stale Chrome profile(s) from {self.root}")
+        return removed
+
+profiles = ProfileManager()
@@ -0,0 +1,9 @@
+import os
+
+# --- PATHS -------------------------------------------------------------
+BASE_DIR      = os.path.expanduser("~/backend")
+PICTURES_BASE = os.path.join(BASE_DIR, "pictures")
+DATA_DIR      = os.path.join(BASE_DIR, "data")
+
+LIBRARY_DB    = os.path.join(DATA_DIR, "library.sqlite3")
+JOBS_DB       = os.path.join(DATA_DIR, "jobs.sqlite3")
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .retry import FatalError, RetryPolicy, host_of
+from .streaming import DEFAULT_CHUNK_SIZE, adopt_file, stream_to_file
+
+HEADERS    = {"User-Agent": "Mozilla/5.0"}
+IMAGE_EXTS = ("webp", "jpg", "jpeg", "png", "gif")
+
+DEFAULT_WORKERS      = 6
+DEFAULT_MIN_INTERVAL = 0.15   # seconds between two requests to the same host
+DEFAULT_TIMEOUT      = 20
+DEFAULT_PAGE_RETRIES = 2
+
+
+class ChapterDownloadError(Exception):
+    """Raised when any page of a chapter could not be fetched."""
+
+
+# ── naming ────────────────────────────────────────────────────────────────────
+def image_name(url: str, index: int) -> str:
+    """Return the on-disk name for page *index*, e.g. ``001.webp``."""
+    base = url.split("?")[0].split("#")[0]
+    ext  = base.rsplit(".", 1)[-1].lower() if "." in base else "jpg"
+    if ext not in IMAGE_EXTS:
+        ext = "jpg"
+    return f"{index:03d}.{ext}"
+
+
+# ── per-host throttle ─────────────────────────────────────────────────────────
+class HostRateLimiter:
+    """Spaces out request *starts* per host by at least ``min_interval`` s."""
+
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL) -> None:
+        self.min_interval = min_interval
+        self._next: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            now  = monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.min_interval
+        if slot > now:
+            sleep(slot - now)
+
+
+# ── engine ────────────────────────────────────────────────────────────────────
+class ImageDownloader:
+    """Fetch a chapter's pages concurrently into ``001.ext``, ``002.ext`` …
+
+    One instance is meant to live for the whole run: the worker threads and
+    their keep-alive sessions are reused from chapter to chapter.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        page_retries: int = DEFAULT_PAGE_RETRIES,
+        headers: dict | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        hash_name: str | None = None,
+    ) -> None:
+        self.workers      = workers
+        self.timeout      = timeout
+        self.page_retries = page_retries
+        self.chunk_size   = chunk_size
+        self.hash_name    = hash_name
+        self.headers      = headers or HEADERS
+        self.limiter      = HostRateLimiter(min_interval)
+        self.policy       = RetryPolicy(attempts=page_retries + 1, base=0.5, cap=8)
+        self._local       = threading.local()
+        self._pool        = ThreadPoolExecutor(max_workers=workers,
+                                               thread_name_prefix="img")
+
+    # -- lifecycle -------------------------------------------------------------
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ImageDownloader":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    # -- internals -------------------------------------------------------------
+    def _session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            sess.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+            sess.mount("https://", adapter)
+            sess.mount("http://", adapter)
+            self._local.session = sess
+        return sess
+
+    def _fetch_once(self, url: str, path: str, abort: threading.Event,
+                    digests: dict | None) -> int:
+        if abort.is_set():
+            raise FatalError("chapter aborted")
+        self.limiter.wait(url)
+        with self._session().get(url, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            result = stream_to_file(resp, path, self.chunk_size, self.hash_name)
+        if digests is not None:
+            digests[os.path.basename(path)] = result.digest
+        return result.bytes
+
+    def _fetch_page(self, url: str, path: str, abort: threading.Event,
+                    digests: dict | None) -> int:
+        try:
+            return self.policy.call(self._fetch_once, url, path, abort, digests,
+                                    host=host_of(url))
+        except Exception as exc:
+            raise ChapterDownloadError(f"{url}: {exc}") from exc
+
+    # -- public ----------------------------------------------------------------
+    def download_chapter(self, image_urls: list[str], dest_folder: str,
+                         digests: dict | None = None,
+                         prefetched: dict[str, str] | None = None) -> int:
+        """Save every URL of *image_urls* into *dest_folder*, in order.
+
+        All-or-nothing: if a single page fails, the pages written by this call
+        are removed again and :class:`ChapterDownloadError` is raised.
+        Pages are streamed to disk and renamed into place once complete; with
+        ``hash_name`` set, *digests* is filled with ``{file_name: hexdigest}``.
+        Pages already spooled to disk in *prefetched* (``{url: temp file}``
+        in *dest_folder*, e.g. captured from the browser) are renamed into
+        place; only the rest go over the network. Spooled files that are not
+        used end up removed either way. Returns the number of bytes written.
+        """
+        if not image_urls:
+            self._remove(list((prefetched or {}).values()))
+            raise ChapterDownloadError("no image URLs given")
+
+        os.makedirs(dest_folder, exist_ok=True)
+        paths = [
+            os.path.join(dest_folder, image_name(url, i))
+            for i, url in enumerate(image_urls, start=1)
+        ]
+
+        prefetched = dict(prefetched or {})
+        adopted    = set()
+        written    = 0
+        try:
+            for url, path in zip(image_urls, paths):
+                if url in prefetched:
+                    result   = adopt_file(prefetched.pop(url), path, self.hash_name,
+                                          self.chunk_size)
+                    written += result.bytes
+                    adopted.add(url)
+                    if digests is not None:
+                        digests[os.path.basename(path)] = result.digest
+        except Exception as exc:
+            self._remove(paths + list(prefetched.values()))
+            raise ChapterDownloadError(f"{dest_folder}: {exc}") from exc
+        self._remove(list(prefetched.values()))   # captured but not in image_urls
+
+        abort   = threading.Event()
+        futures = [
+            self._pool.submit(self._fetch_page, url, path, abort, digests)
+            for url, path in zip(image_urls, paths)
+            if url not in adopted
+        ]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+
+        failed = next((f for f in done if f.exception()), None)
+        if failed is None:
+            return written + sum(f.result() for f in futures)
+
+        abort.set()
+        for f in pending:
+            f.cancel()
+        wait(pending)
+        self._remove(paths)
+        raise ChapterDownloadError(str(failed.exception())) from failed.exception()
+
+    @staticmethod
+    def _remove(paths: list[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
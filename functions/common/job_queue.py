@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from .config import JOBS_DB
+from .retry import circuit_open
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    series       TEXT    NOT NULL,
+    source       TEXT    NOT NULL,
+    chapter      INTEGER NOT NULL,
+    payload      TEXT    NOT NULL DEFAULT '{}',
+    state        TEXT    NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    last_error   TEXT,
+    updated_at   REAL    NOT NULL,
+    not_before   REAL,
+    deferrals    INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (series, source, chapter)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (source, state, series, chapter);
+"""
+
+# queued → leased → done | skipped | failed   (leased → queued on error/expiry)
+QUEUED, LEASED, DONE, SKIPPED, FAILED = "queued", "leased", "done", "skipped", "failed"
+
+LEASE_SECONDS  = 1800   # renewed every third of this while the job runs
+DEFER_WAIT_MAX = 300    # a worker waits this long at most for deferred jobs
+MAX_DEFERRALS  = 3      # deferrals before a job behind an open circuit is failed
+
+
+class Job(NamedTuple):
+    id:       int
+    series:   str
+    source:   str
+    chapter:  int
+    payload:  dict
+    attempts:  int
+    deferrals: int = 0
+
+
+class JobSkipped(Exception):
+    """Raised by a worker function when there is nothing to download."""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Durable (series, source, chapter) download queue shared by processes.
+
+    Every process opens its own instance; SQLite's ``BEGIN IMMEDIATE`` makes
+    leasing atomic. A running job's lease is renewed by its worker; one whose
+    lease runs out can be leased again, and :meth:`reclaim` also requeues
+    jobs whose owner process on this host is gone.
+
+    A connection must not cross a fork: close it before forking workers and
+    open a new one afterwards.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, max_attempts: int = 3) -> None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path      = db_path
+        self.max_attempts = max_attempts
+        self._pid = os.getpid()
+        self._db  = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:   # queue files from before deferral existed
+            self._db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+        if "deferrals" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN deferrals INTEGER NOT NULL DEFAULT 0")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _tx(self, sql: str, args: tuple = ()) -> sqlite3.Cursor:
+        if os.getpid() != self._pid:
+            raise RuntimeError("JobQueue connection used across fork – open one in the child")
+        return self._db.execute(sql, args)
+
+    # ── producer side ─────────────────────────────────────────────────────────
+    def enqueue(self, series: str, source: str, chapter: int, payload: dict | None = None) -> None:
+        """Queue a job; finished or failed jobs for the same key are re-armed."""
+        self._tx(
+            """
+            INSERT INTO jobs (series, source, chapter, payload, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (series, source, chapter) DO UPDATE SET
+                payload    = excluded.payload,
+                state      = CASE WHEN state IN ('leased', 'queued') THEN state ELSE 'queued' END,
+                attempts   = CASE WHEN state IN ('leased', 'queued') THEN attempts ELSE 0 END,
+                deferrals  = CASE WHEN state IN ('leased', 'queued') THEN deferrals ELSE 0 END,
+                updated_at = excluded.updated_at
+            """,
+            (series, source, chapter, json.dumps(payload or {}), time.time()),
+        )
+
+    def reclaim(self) -> int:
+        """Requeue expired leases and leases held by dead processes on this host."""
+        now  = time.time()
+        host = socket.gethostname()
+        self._tx("BEGIN IMMEDIATE")
+        try:
+            stale = []
+            for job_id, owner, until in self._tx(
+                "SELECT id, lease_owner, lease_until FROM jobs WHERE state = ?", (LEASED,)
+            ).fetchall():
+                owner_host, _, pid = (owner or "").rpartition(":")
+                dead = owner_host == host and pid.isdigit() and not pid_alive(int(pid))
+                if dead or (until or 0) < now:
+                    stale.append(job_id)
+            for job_id in stale:
+                self._tx(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, lease_until = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    (QUEUED, now, job_id),
+                )
+            self._tx("COMMIT")
+        except BaseException:
+            self._tx("ROLLBACK")
+            raise
+        return len(stale)
+
+    # ── worker side ───────────────────────────────────────────────────────────
+    def lease(self, source: str, owner: str, lease_seconds: float = LEASE_SECONDS,
+              accept: Callable[[str], bool] | None = None) -> Job | None:
+        """Atomically take the next queued job for *source* (``None`` if empty).
+
+        Jobs whose lease expired count as queued; deferred jobs wait for
+        their ``not_before``. ``accept(series)`` can veto series this worker
+        must not take.
+        """
+        now = time.time()
+        self._tx("BEGIN IMMEDIATE")
+        try:
+            rows = self._tx(
+                "SELECT id, series, source, chapter, payload, attempts, deferrals FROM jobs "
+                "WHERE source = ? AND ((state = ? AND COALESCE(not_before, 0) <= ?) "
+                "OR (state = ? AND lease_until < ?)) "
+                "ORDER BY series, chapter",
+                (source, QUEUED, now, LEASED, now),
+            )
+            row = next((r for r in rows if accept is None or accept(r[1])), None)
+            if row is None:
+                self._tx("COMMIT")
+                return None
+            self._tx(
+                "UPDATE jobs SET state = ?, lease_owner = ?, lease_until = ?, "
+                "updated_at = ? WHERE id = ?",
+                (LEASED, owner, now + lease_seconds, now, row[0]),
+            )
+            self._tx("COMMIT")
+        except BaseException:
+            self._tx("ROLLBACK")
+            raise
+        return Job(row[0], row[1], row[2], row[3], json.loads(row[4]), row[5], row[6])
+
+    def renew(self, job: Job, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Push *job*'s lease forward; ``False`` if *owner* no longer holds it."""
+        now = time.time()
+        cur = self._tx(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND state = ? AND lease_owner = ?",
+            (now + lease_seconds, now, job.id, LEASED, owner),
+        )
+        return cur.rowcount == 1
+
+    def _finish(self, job: Job, state: str, error: str | None = None) -> None:
+        self._tx(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, last_error = ?, "
+            "lease_owner = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (state, error, time.time(), job.id),
+        )
+
+    def complete(self, job: Job) -> None:
+        self._finish(job, DONE)
+
+    def skip(self, job: Job, reason: str) -> None:
+        self._finish(job, SKIPPED, reason)
+
+    def fail(self, job: Job, error: str) -> None:
+        state = FAILED if job.attempts + 1 >= self.max_attempts else QUEUED
+        self._finish(job, state, error)
+
+    def defer(self, job: Job, delay: float, reason: str) -> bool:
+        """Put *job* back for *delay* seconds without counting an attempt.
+
+        After ``MAX_DEFERRALS`` the host is treated as down for this run: the
+        job fails with *reason* instead and ``False`` is returned.
+        """
+        if job.deferrals >= MAX_DEFERRALS:
+            self._finish(job, FAILED, reason)
+            return False
+        now = time.time()
+        self._tx(
+            "UPDATE jobs SET state = ?, not_before = ?, deferrals = deferrals + 1, "
+            "last_error = ?, lease_owner = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (QUEUED, now + delay, reason, now, job.id),
+        )
+        return True
+
+    def next_deferred(self, source: str, accept: Callable[[str], bool] | None = None) -> float | None:
+        """Seconds until the earliest deferred job of *source* is ready (``None`` if none)."""
+        now  = time.time()
+        rows = self._tx(
+            "SELECT series, not_before FROM jobs WHERE source = ? AND state = ? "
+            "AND not_before > ? ORDER BY not_before",
+            (source, QUEUED, now),
+        )
+        return next((nb - now for series, nb in rows if accept is None or accept(series)), None)
+
+    # ── reporting ─────────────────────────────────────────────────────────────
+    def counts(self, source: str) -> dict[str, int]:
+        return dict(self._tx(
+            "SELECT state, COUNT(*) FROM jobs WHERE source = ? GROUP BY state", (source,)
+        ).fetchall())
+
+    def failures(self, source: str, since: float) -> list[tuple[str, int, str]]:
+        return self._tx(
+            "SELECT series, chapter, last_error FROM jobs "
+            "WHERE source = ? AND state = ? AND updated_at >= ? ORDER BY series, chapter",
+            (source, FAILED, since),
+        ).fetchall()
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ── worker processes ──────────────────────────────────────────────────────────
+class _LeaseKeeper(threading.Thread):
+    """Renews one job's lease while it runs, on its own connection."""
+
+    def __init__(self, db_path: str, job: Job, owner: str,
+                 lease_seconds: float = LEASE_SECONDS) -> None:
+        super().__init__(name=f"lease-{job.id}", daemon=True)
+        self.db_path       = db_path
+        self.job           = job
+        self.owner         = owner
+        self.lease_seconds = lease_seconds
+        self._done         = threading.Event()
+
+    def run(self) -> None:
+        queue = JobQueue(self.db_path)
+        try:
+            while not self._done.wait(self.lease_seconds / 3):
+                if not queue.renew(self.job, self.owner, self.lease_seconds):
+                    print(f"⚠️  Lost the lease on {self.job.series} chapter {self.job.chapter}")
+                    return
+        except sqlite3.Error as exc:
+            print(f"⚠️  Lease renewal failed for {self.job.series} chapter {self.job.chapter}: {exc}")
+        finally:
+            queue.close()
+
+    def __enter__(self) -> _LeaseKeeper:
+        self.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._done.set()
+        self.join()
+
+
+def _worker_loop(source: str, handle: Callable[[Job], None],
+                 setup: Callable[[], None] | None,
+                 teardown: Callable[[], None] | None,
+                 accept: Callable[[str], bool] | None,
+                 max_attempts: int) -> None:
+    if setup:
+        setup()
+    queue = JobQueue(max_attempts=max_attempts)   # opened after the fork
+    owner = worker_id()
+    try:
+        while True:
+            job = queue.lease(source, owner, accept=accept)
+            if job is None:
+                # only jobs held back by an open circuit left: wait for them briefly
+                wait = queue.next_deferred(source, accept)
+                if wait is None or wait > DEFER_WAIT_MAX:
+                    break
+                time.sleep(wait)
+                continue
+            try:
+                with _LeaseKeeper(queue.db_path, job, owner):
+                    handle(job)
+            except JobSkipped as exc:
+                queue.skip(job, str(exc))
+            except Exception as exc:
+                if (opened := circuit_open(exc)) is not None:
+                    # the host is paused, not the chapter broken – try it again later
+                    if not queue.defer(job, opened.retry_after, str(opened)):
+                        print(f"⛔  {job.series} chapter {job.chapter}: host still down "
+                              f"after {MAX_DEFERRALS} deferrals, giving up")
+                else:
+                    queue.fail(job, str(exc) or type(exc).__name__)
+            else:
+                queue.complete(job)
+    finally:
+        queue.close()
+        if teardown:
+            teardown()
+
+
+def run_workers(
+    source: str,
+    handle: Callable[[Job], None],
+    workers: int = 1,
+    setup: Callable[[], None] | None = None,
+    teardown: Callable[[], None] | None = None,
+    accept: Callable[[str], bool] | None = None,
+    max_attempts: int = 3,
+) -> None:
+    """Drain the *source* queue with *workers* processes (in-process if 1).
+
+    ``handle(job)`` does the work: return to complete the job, raise
+    :class:`JobSkipped` to skip it, anything else to fail it – except a
+    failure caused by an open circuit breaker, which defers the job until
+    the circuit may close again (at most ``MAX_DEFERRALS`` times). ``setup`` /
+    ``teardown`` run inside each worker, e.g. to open a browser pool. The
+    caller must not hold an open :class:`JobQueue` across this call when
+    *workers* > 1.
+    """
+    args = (source, handle, setup, teardown, accept, max_attempts)
+    if workers <= 1:
+        _worker_loop(*args)
+        return
+
+    ctx   = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_worker_loop, args=args, name=f"{source}-worker-{i}")
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Callable
+from urllib.parse import urlsplit
+
+import requests
+
+from .image_downloader import HEADERS
+
+PROBE_TIMEOUT = 10
+GAP           = 2        # missing chapter numbers tolerated at the boundary
+AHEAD         = 20       # probed chapters allowed past the listing / newest local one
+LIMIT         = 10_000   # never gallop past this
+
+
+def url_exists(session: requests.Session, url: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Cheap existence check: ``HEAD``, or a 1-byte ranged ``GET`` if HEAD is refused.
+
+    A redirect that lands on a different path (e.g. the series page) counts
+    as missing.
+    """
+    try:
+        res = session.head(url, headers=HEADERS, allow_redirects=True, timeout=timeout)
+        if res.status_code in (403, 405, 501):
+            res = session.get(url, headers={**HEADERS, "Range": "bytes=0-0"},
+                              allow_redirects=True, timeout=timeout, stream=True)
+            res.close()
+    except requests.RequestException:
+        return False
+    if res.status_code not in (200, 206):
+        return False
+    return urlsplit(res.url).path.rstrip("/") == urlsplit(url).path.rstrip("/")
+
+
+def gallop(exists: Callable[[int], bool], known: int = 0,
+           gap: int = GAP, limit: int = LIMIT) -> int:
+    """Highest chapter for which ``exists(n)`` holds, searching up from *known*.
+
+    Doubles the step until a probe misses, then binary-searches the last
+    interval – O(log n) probes. *known* (e.g. the newest local chapter) is
+    trusted without probing. Before accepting the boundary the next *gap*
+    numbers are probed too, so one skipped chapter number does not end
+    the search early.
+    """
+    lo = max(known, 0)
+    while True:
+        step = 1
+        while lo + step <= limit and exists(lo + step):
+            lo  += step
+            step *= 2
+        hi = min(lo + step, limit + 1)      # first number known (or assumed) missing
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if exists(mid):
+                lo = mid
+            else:
+                hi = mid
+
+        beyond = next((n for n in range(lo + 2, lo + 2 + gap) if n <= limit and exists(n)), None)
+        if beyond is None:
+            return lo
+        lo = beyond
+
+
+def resolve_latest(name: str, exists: Callable[[int], bool], known: int = 0,
+                   listed: int | None = None, ahead: int = AHEAD) -> int:
+    """Newest chapter: a :func:`gallop` cross-checked with a listing-based one.
+
+    Listings lag and probes get blocked, so normally the higher value wins.
+    But a site that answers ``200`` for missing chapters (a soft 404) makes
+    every probe succeed. So the gallop may go at most *ahead* past the
+    listing, and reaching that cap means the listing wins. Without a
+    listing, one probe of a number no series has tells whether probes can
+    be trusted at all. Returns 0 if neither found anything.
+    """
+    if listed is None:
+        if exists(LIMIT + 1):
+            print(f"⚠️  {name}: chapter {LIMIT + 1} \"exists\" – probes unreliable, keeping {known}")
+            return known
+        return gallop(exists, known)
+
+    limit  = min(max(known, listed) + ahead, LIMIT)
+    probed = gallop(exists, known, limit=limit)
+    if probed >= limit:
+        print(f"⚠️  {name}: probes ran {ahead} past the listing ({listed}) – trusting the listing")
+        return max(listed, known)
+    if listed != probed:
+        print(f"⚠️  {name}: probed latest {probed}, listing says {listed}")
+    return max(probed, listed)
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+from .config import DATA_DIR, LIBRARY_DB, PICTURES_BASE
+
+IMAGE_EXTS = (".webp", ".jpg", ".jpeg", ".png", ".gif")
+CHAPTER_RE = re.compile(r"chapter-(\d+)$")
+
+RECONCILE_MAX_AGE = 7 * 24 * 60 * 60   # full re-walk of a series at most weekly
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    name        TEXT PRIMARY KEY,
+    mtime       REAL NOT NULL,
+    scanned_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    series      TEXT    NOT NULL,
+    number      INTEGER NOT NULL,
+    source      TEXT    NOT NULL,
+    pages       INTEGER NOT NULL,
+    formats     TEXT    NOT NULL,
+    bytes       INTEGER NOT NULL,
+    mtime       REAL    NOT NULL,
+    files       TEXT    NOT NULL,
+    PRIMARY KEY (series, number)
+);
+CREATE TABLE IF NOT EXISTS usage (
+    series        TEXT    PRIMARY KEY,
+    bytes         INTEGER NOT NULL,
+    chapters      INTEGER NOT NULL,
+    reconciled_at REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marks (
+    series      TEXT    NOT NULL,
+    number      INTEGER NOT NULL,
+    kind        TEXT    NOT NULL,
+    mtime       REAL    NOT NULL,
+    PRIMARY KEY (series, number, kind)
+);
+"""
+
+
+class Chapter(NamedTuple):
+    series:  str
+    number:  int
+    source:  str           # stripped content of source.txt ("" if none)
+    pages:   int
+    formats: tuple         # e.g. ("jpg", "webp")
+    bytes:   int           # every file in the folder, source.txt included
+    mtime:   float         # chapter folder mtime
+    files:   tuple         # image file names, sorted
+
+    @property
+    def dir_name(self) -> str:
+        return f"chapter-{self.number}"
+
+
+def _scan_chapter(series: str, number: int, path: str, mtime: float) -> Chapter:
+    files, formats, total, source = [], set(), 0, ""
+    with os.scandir(path) as it:
+        for de in it:
+            if not de.is_file():
+                continue
+            try:
+                total += de.stat().st_size
+            except OSError:
+                continue
+            low = de.name.lower()
+            if low.endswith(IMAGE_EXTS):
+                files.append(de.name)
+                formats.add(low.rsplit(".", 1)[-1])
+            elif de.name == "source.txt":
+                try:
+                    with open(de.path, encoding="utf-8", errors="ignore") as f:
+                        source = f.read().strip()
+                except OSError:
+                    pass
+    files.sort()
+    return Chapter(series, number, source, len(files), tuple(sorted(formats)),
+                   total, mtime, tuple(files))
+
+
+class LibraryIndex:
+    """SQLite index of ``<root>/<series>/chapter-N`` folders.
+
+    Refreshing a series lists its folder and stats each chapter folder; only
+    chapters whose folder mtime moved (a file added, removed or renamed into
+    place) are re-listed. Rewriting a file in place touches neither mtime, so
+    writers that do that should call :meth:`update_chapter`.
+
+    Byte totals per series live in ``usage`` and move by the size difference
+    of every chapter row written or dropped, so asking how big a series is
+    never walks the tree.
+    """
+
+    def __init__(self, root: str = PICTURES_BASE, db_path: str = LIBRARY_DB) -> None:
+        self.root = root
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ── rows ↔ tuples ─────────────────────────────────────────────────────────
+    @staticmethod
+    def _row(c: Chapter) -> tuple:
+        return (c.series, c.number, c.source, c.pages, ",".join(c.formats),
+                c.bytes, c.mtime, json.dumps(c.files))
+
+    @staticmethod
+    def _chapter(row: tuple) -> Chapter:
+        series, number, source, pages, formats, nbytes, mtime, files = row
+        return Chapter(series, number, source, pages,
+                       tuple(formats.split(",")) if formats else (),
+                       nbytes, mtime, tuple(json.loads(files)))
+
+    def _put(self, chapter: Chapter) -> None:
+        old = self._db.execute(
+            "SELECT bytes FROM chapters WHERE series = ? AND number = ?",
+            (chapter.series, chapter.number),
+        ).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._row(chapter),
+        )
+        if old is None:
+            self._account(chapter.series, chapter.bytes, 1)
+        else:
+            self._account(chapter.series, chapter.bytes - old[0], 0)
+
+    def _drop(self, series: str, number: int) -> None:
+        old = self._db.execute(
+            "SELECT bytes FROM chapters WHERE series = ? AND number = ?", (series, number)
+        ).fetchone()
+        if old is None:
+            return
+        self._db.execute(
+            "DELETE FROM chapters WHERE series = ? AND number = ?", (series, number)
+        )
+        self._account(series, -old[0], -1)
+
+    def _drop_series(self, series: str) -> None:
+        self._db.execute("DELETE FROM chapters WHERE series = ?", (series,))
+        self._db.execute("DELETE FROM series WHERE name = ?", (series,))
+        self._db.execute("DELETE FROM usage WHERE series = ?", (series,))
+
+    # ── storage accounting ────────────────────────────────────────────────────
+    def _account(self, series: str, delta_bytes: int, delta_chapters: int) -> None:
+        cur = self._db.execute(
+            "UPDATE usage SET bytes = bytes + ?, chapters = chapters + ? WHERE series = ?",
+            (delta_bytes, delta_chapters, series),
+        )
+        if cur.rowcount == 0:
+            self._rebuild_usage(series)
+
+    def _rebuild_usage(self, series: str) -> None:
+        nbytes, count = self._db.execute(
+            "SELECT COALESCE(SUM(bytes), 0), COUNT(*) FROM chapters WHERE series = ?",
+            (series,),
+        ).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?)",
+            (series, nbytes, count, time.time()),
+        )
+
+    def series_bytes(self, series: str) -> int:
+        """Bytes stored for *series*, from the running total."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT bytes FROM usage WHERE series = ?", (series,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM usage").fetchone()[0]
+
+    def reconcile_series(self, series: str) -> None:
+        """Re-walk every chapter of *series* and reset its running total."""
+        self.refresh_series(series, deep=True)
+        with self._lock, self._db:
+            self._rebuild_usage(series)
+
+    def reconcile_if_stale(self, series: str, max_age: float = RECONCILE_MAX_AGE) -> bool:
+        """Reconcile *series* when its totals were last rebuilt over *max_age* ago."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT reconciled_at FROM usage WHERE series = ?", (series,)
+            ).fetchone()
+        if row and time.time() - row[0] < max_age:
+            return False
+        self.reconcile_series(series)
+        return True
+
+    # ── refreshing ────────────────────────────────────────────────────────────
+    def refresh_series(self, series: str, deep: bool = False) -> None:
+        path = os.path.join(self.root, series)
+        with self._lock, self._db:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._drop_series(series)
+                return
+
+            known = dict(self._db.execute(
+                "SELECT number, mtime FROM chapters WHERE series = ?", (series,)
+            ).fetchall())
+            seen = set()
+            with os.scandir(path) as it:
+                for de in it:
+                    m = CHAPTER_RE.match(de.name)
+                    if not m or not de.is_dir():
+                        continue
+                    number = int(m.group(1))
+                    seen.add(number)
+                    mtime = de.stat().st_mtime
+                    if known.get(number) == mtime and not deep:
+                        continue
+                    self._put(_scan_chapter(series, number, de.path, mtime))
+
+            for number in set(known) - seen:
+                self._drop(series, number)
+            self._db.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?)",
+                (series, st.st_mtime, time.time()),
+            )
+
+    def refresh(self, deep: bool = False) -> None:
+        """Bring every series under ``root`` up to date (and forget vanished ones)."""
+        names = {
+            de.name for de in os.scandir(self.root) if de.is_dir()
+        } if os.path.isdir(self.root) else set()
+        for name in sorted(names):
+            self.refresh_series(name, deep=deep)
+        with self._lock, self._db:
+            for (gone,) in self._db.execute("SELECT name FROM series").fetchall():
+                if gone not in names:
+                    self._drop_series(gone)
+
+    def reconcile(self) -> None:
+        """Full rescan of every chapter folder, ignoring stored mtimes."""
+        self.refresh(deep=True)
+        with self._lock, self._db:
+            for name in self.all_series():
+                self._rebuild_usage(name)
+
+    def update_chapter(self, series: str, number: int) -> Chapter | None:
+        """Re-read one chapter folder after writing to it (or deleting it)."""
+        path = os.path.join(self.root, series, f"chapter-{number}")
+        with self._lock, self._db:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                self._drop(series, number)
+                return None
+            chapter = _scan_chapter(series, number, path, mtime)
+            self._put(chapter)
+            return chapter
+
+    # ── queries ───────────────────────────────────────────────────────────────
+    def all_series(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT name FROM series ORDER BY name")]
+
+    def chapters(self, series: str, refresh: bool = True) -> list[Chapter]:
+        if refresh:
+            self.refresh_series(series)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM chapters WHERE series = ? ORDER BY number", (series,)
+            ).fetchall()
+        return [self._chapter(r) for r in rows]
+
+    def chapter_numbers(self, series: str) -> set[int]:
+        return {c.number for c in self.chapters(series)}
+
+    def latest_chapter(self, series: str, source_contains: str | None = None) -> int | None:
+        nums = [
+            c.number for c in self.chapters(series)
+            if source_contains is None or source_contains in c.source
+        ]
+        return max(nums) if nums else None
+
+    # ── per-chapter marks (e.g. "lowres" generated for this folder state) ────
+    def is_marked(self, chapter: Chapter, kind: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT mtime FROM marks WHERE series = ? AND number = ? AND kind = ?",
+                (chapter.series, chapter.number, kind),
+            ).fetchone()
+        return bool(row) and row[0] == chapter.mtime
+
+    def mark(self, chapter: Chapter, kind: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO marks VALUES (?, ?, ?, ?)",
+                (chapter.series, chapter.number, kind, chapter.mtime),
+            )
+
+
+_open: dict[tuple[str, int], LibraryIndex] = {}
+_open_lock = threading.Lock()
+
+
+def open_library(root: str = PICTURES_BASE) -> LibraryIndex:
+    """Return this process's index for *root*, opening it on first use.
+
+    Keyed by pid as well, so forked workers never share a SQLite connection.
+    """
+    root = os.path.abspath(os.path.expanduser(str(root)))
+    key  = (root, os.getpid())
+    with _open_lock:
+        if key not in _open:
+            if root == os.path.abspath(PICTURES_BASE):
+                db_path = LIBRARY_DB
+            else:
+                tag = hashlib.sha1(root.encode()).hexdigest()[:12]
+                db_path = os.path.join(DATA_DIR, f"library-{tag}.sqlite3")
+            _open[key] = LibraryIndex(root, db_path)
+        return _open[key]
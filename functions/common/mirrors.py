@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, time
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import DATA_DIR
+from .image_downloader import HEADERS
+
+PROBE_TIMEOUT  = 5
+EWMA_ALPHA     = 0.3
+SICK_AFTER     = 3            # consecutive network failures
+SICK_COOLDOWN  = 60 * 60      # then skip the mirror for an hour
+
+
+class MirrorResolver:
+    """Find a working chapter URL across mirror domains and slug formats.
+
+    Every mirror × slug combination is HEAD-probed concurrently and the
+    answers are ranked by latency. Per-mirror latency/health and the slug
+    format that worked for each run of chapters are kept in a JSON file, so
+    later runs try the known-good URL first and only race when it misses.
+
+    *url_format* is filled with ``base`` and ``slug``; *slug_formats* with
+    ``n`` (the chapter number), e.g. ``"kingdom-chapter-{n:03d}"``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mirrors: list[str],
+        slug_formats: list[str],
+        url_format: str = "{base}/chapter/{slug}/",
+        session: requests.Session | None = None,
+        state_path: str | None = None,
+    ) -> None:
+        self.mirrors      = mirrors
+        self.slug_formats = slug_formats
+        self.url_format   = url_format
+        self.session      = session or requests.Session()
+        self.state_path   = state_path or os.path.join(DATA_DIR, f"mirrors_{name}.json")
+        self._lock        = threading.Lock()
+        self.state        = self._load()
+        self.stats        = {"direct": 0, "raced": 0, "probes": 0}
+        self._formats_of: dict[str, str] = {}   # url → slug format, last resolve
+        self.last_raced   = False
+
+    # -- persistence -----------------------------------------------------------
+    def _load(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("mirrors", {})
+        state.setdefault("formats", [])   # [[first, last, slug_format], …]
+        return state
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # -- mirror health ---------------------------------------------------------
+    def _mirror(self, base: str) -> dict:
+        return self.state["mirrors"].setdefault(
+            base, {"latency": None, "fails": 0, "last_fail": 0, "last_ok": 0}
+        )
+
+    def _healthy(self, base: str) -> bool:
+        m = self._mirror(base)
+        return m["fails"] < SICK_AFTER or time() - m["last_fail"] > SICK_COOLDOWN
+
+    def _ranked_mirrors(self) -> list[str]:
+        healthy = [b for b in self.mirrors if self._healthy(b)] or list(self.mirrors)
+        return sorted(healthy, key=lambda b: self._mirror(b)["latency"] or float("inf"))
+
+    def _note(self, base: str, seconds: float | None) -> None:
+        with self._lock:
+            m = self._mirror(base)
+            if seconds is None:
+                m["fails"]    += 1
+                m["last_fail"] = time()
+                return
+            m["fails"]   = 0
+            m["last_ok"] = time()
+            m["latency"] = seconds if m["latency"] is None else \
+                round(EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * m["latency"], 4)
+
+    # -- learned slug formats --------------------------------------------------
+    def _format_for(self, n: int) -> str | None:
+        """The format of the range holding *n*, else of the nearest range below."""
+        below = None
+        for first, last, fmt in self.state["formats"]:
+            if first <= n <= last:
+                return fmt
+            if last < n and (below is None or last > below[0]):
+                below = (last, fmt)
+        return below[1] if below else None
+
+    def _learn(self, n: int, fmt: str) -> None:
+        with self._lock:
+            ranges = self.state["formats"]
+            for r in ranges:
+                if r[2] == fmt and r[0] - 1 <= n <= r[1] + 1:
+                    r[0], r[1] = min(r[0], n), max(r[1], n)
+                    break
+            else:
+                ranges.append([n, n, fmt])
+            ranges.sort()
+
+    # -- probing ---------------------------------------------------------------
+    def _url(self, base: str, fmt: str, n: int) -> str:
+        return self.url_format.format(base=base, slug=fmt.format(n=n))
+
+    def _probe(self, base: str, fmt: str, n: int) -> tuple[str, str, float] | None:
+        url   = self._url(base, fmt, n)
+        start = monotonic()
+        with self._lock:
+            self.stats["probes"] += 1
+        try:
+            res = self.session.head(url, headers=HEADERS, allow_redirects=True,
+                                    timeout=PROBE_TIMEOUT)
+        except requests.RequestException:
+            self._note(base, None)
+            return None
+        elapsed = monotonic() - start
+        if res.status_code >= 500:
+            self._note(base, None)
+            return None
+        self._note(base, elapsed)
+        moved = urlsplit(res.url).path.rstrip("/") != urlsplit(url).path.rstrip("/")
+        return (url, fmt, elapsed) if res.status_code == 200 and not moved else None
+
+    def primary_url(self, n: int) -> str:
+        """Chapter *n* on the fastest healthy mirror in the learned format – for
+        cheap existence probes that must not race every mirror."""
+        fmt = self._format_for(n) or self.slug_formats[0]
+        return self._url(self._ranked_mirrors()[0], fmt, n)
+
+    def resolve(self, n: int, race: bool = False) -> list[str]:
+        """Working URLs for chapter *n*, best first (empty if none answered).
+
+        Tries the learned format on the fastest mirror first unless *race*.
+        """
+        fmt = None if race else self._format_for(n)
+        if fmt:
+            for base in self._ranked_mirrors()[:1]:
+                hit = self._probe(base, fmt, n)
+                if hit:
+                    self.last_raced = False
+                    self.stats["direct"] += 1
+                    self._formats_of = {hit[0]: fmt}
+                    return [hit[0]]
+
+        self.last_raced = True
+        self.stats["raced"] += 1
+        combos = [(b, f) for b in self._ranked_mirrors() for f in self.slug_formats]
+        with ThreadPoolExecutor(max_workers=len(combos)) as pool:
+            hits = [h for h in pool.map(lambda c: self._probe(c[0], c[1], n), combos) if h]
+        hits.sort(key=lambda h: h[2])
+        self._formats_of = {url: fmt for url, fmt, _ in hits}
+        return [h[0] for h in hits]
+
+    def confirm(self, n: int, url: str) -> None:
+        """Record that *url* really served chapter *n* and persist the state.
+
+        A ``200`` alone is not trusted, since a mirror may redirect a missing
+        chapter to its front page.
+        """
+        fmt = self._formats_of.get(url)
+        if fmt:
+            self._learn(n, fmt)
+        self.save()
+
+    def report(self) -> str:
+        s = self.stats
+        lines = [f"🪞  Mirrors: {s['direct']} direct, {s['raced']} raced, {s['probes']} probes"]
+        for base in self.mirrors:
+            m = self._mirror(base)
+            lat = f"{m['latency']:.2f}s" if m["latency"] is not None else "   -  "
+            lines.append(f"    {base:<32} {lat}  {'ok' if self._healthy(base) else 'sick'}")
+        return "\n".join(lines)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import tempfile
+
+# Chrome already downloads every page image while rendering a chapter. With
+# performance logging on, chromedriver records the DevTools Network events, so
+# the finished responses can be read back with ``Network.getResponseBody``
+# instead of fetching the same bytes a second time. Each body is spooled to a
+# hidden file as soon as it is read, so a chapter never sits in memory.
+
+
+def enable_capture(options):
+    """Turn on DevTools network logging for a Chrome ``Options`` object."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def drain(driver) -> None:
+    """Drop buffered network events, e.g. before loading the next chapter."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def _spool(spool_dir: str, body: bytes) -> str:
+    fd, path = tempfile.mkstemp(dir=spool_dir, prefix=".capture-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def capture_image_bodies(driver, image_urls: list[str], spool_dir: str) -> dict[str, str]:
+    """Spool the *image_urls* the browser has finished into *spool_dir*.
+
+    Returns ``{url: temp file}``; pass it to ``ImageDownloader.download_chapter``
+    with *spool_dir* as the destination folder, which renames the files into
+    place (or removes them). Only complete ``200`` image responses whose
+    length matches their ``Content-Length`` are kept; anything missing,
+    evicted or odd is simply left out for the caller to fetch over HTTP. A
+    driver started without :func:`enable_capture` yields ``{}``.
+    """
+    wanted = set(image_urls)
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return {}
+
+    responses: dict[str, tuple[str, dict]] = {}
+    finished:  set[str] = set()
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = msg.get("method")
+        params = msg.get("params", {})
+        if method == "Network.responseReceived":
+            resp = params.get("response", {})
+            if (resp.get("url") in wanted and resp.get("status") == 200
+                    and resp.get("mimeType", "").startswith("image/")):
+                responses[resp["url"]] = (params["requestId"], resp.get("headers", {}))
+        elif method == "Network.loadingFinished":
+            finished.add(params.get("requestId"))
+
+    os.makedirs(spool_dir, exist_ok=True)
+    spooled: dict[str, str] = {}
+    for url, (request_id, resp_headers) in responses.items():
+        if request_id not in finished:
+            continue
+        try:
+            result = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            continue   # evicted from Chrome's buffer
+        if not result.get("base64Encoded"):
+            continue
+        body = base64.b64decode(result["body"])
+
+        headers  = {k.lower(): v for k, v in resp_headers.items()}
+        expected = headers.get("content-length")
+        encoded  = headers.get("content-encoding", "identity") != "identity"
+        if not body or (expected and expected.isdigit() and not encoded
+                         and len(body) != int(expected)):
+            continue
+        try:
+            spooled[url] = _spool(spool_dir, body)
+        except OSError:
+            continue   # e.g. disk full – HTTP gets its turn
+    return spooled
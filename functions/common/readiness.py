@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import atexit
+import fcntl
+import json
+import os
+import threading
+from time import monotonic, sleep, time
+from typing import NamedTuple
+
+from .config import DATA_DIR
+from .url_harvest import is_harvest
+
+READINESS_FILE = os.path.join(DATA_DIR, "readiness.json")
+
+DEFAULT_DEADLINE = 30.0   # hard upper bound for any single wait
+MIN_DEADLINE     = 3.0
+STABLE_FOR       = 0.75   # image count must hold this long
+POLL             = 0.15
+HISTORY          = 20     # durations kept per site
+
+# One round-trip per poll: force lazy images eager, pull data-src style
+# attributes into src, scroll the first undecoded image into view (for
+# IntersectionObserver loaders) and report [found, decoded].
+_PROBE_JS = """
+const [selector, lazyAttrs, nudge] = arguments;
+const imgs = Array.from(document.querySelectorAll(selector));
+let decoded = 0, pending = null;
+for (const img of imgs) {
+    if (img.loading === 'lazy') img.loading = 'eager';
+    const src = img.getAttribute('src') || '';
+    if (!src || src.startsWith('data:')) {
+        for (const a of lazyAttrs) {
+            const v = img.getAttribute(a);
+            if (v && !v.startsWith('data:')) { img.setAttribute('src', v.trim()); break; }
+        }
+    }
+    if (img.complete && img.naturalWidth > 0) decoded++;
+    else if (pending === null) pending = img;
+}
+if (nudge && pending) pending.scrollIntoView({block: 'center'});
+return [imgs.length, decoded];
+"""
+
+LAZY_ATTRS = ["data-src", "data-lazy-src", "data-cfsrc", "data-original"]
+
+
+class ReadyResult(NamedTuple):
+    count:     int      # matching <img> elements
+    decoded:   int      # of those, complete && naturalWidth > 0
+    elapsed:   float
+    timed_out: bool
+
+
+class ReadinessTracker:
+    """Wait for chapter images by condition instead of fixed sleeps.
+
+    A page is ready once the number of ``selector`` images has stopped
+    changing and – with ``require_decoded`` – every one of them is decoded.
+    How long each site needed to settle is persisted, and the next deadline
+    is derived from that history, so a stuck page is abandoned about as soon
+    as the site is known to be done. Timeouts are not recorded: a missing
+    chapter never settles and would only inflate the deadline.
+
+    New samples are merged into the file by :meth:`save` – at exit, and from
+    worker teardowns (forked workers skip ``atexit``).
+    """
+
+    def __init__(self, path: str = READINESS_FILE,
+                 default_deadline: float = DEFAULT_DEADLINE) -> None:
+        self.path             = path
+        self.default_deadline = default_deadline
+        self._lock            = threading.Lock()
+        self._history: dict[str, list[float]] = self._load()
+        self._new:     dict[str, list[float]] = {}   # recorded since the last save
+        os.register_at_fork(after_in_child=self._forget_new)
+        atexit.register(self.save)
+
+    # -- persistence -----------------------------------------------------------
+    def _load(self) -> dict[str, list[float]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("sites", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _forget_new(self) -> None:
+        # a forked worker saves only what it measured itself
+        self._new  = {}
+        self._lock = threading.Lock()
+
+    def save(self) -> None:
+        """Merge this process's new samples into the file, under a lock."""
+        with self._lock:
+            new, self._new = self._new, {}
+        if not new:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)   # other workers and scrapers save too
+            sites = self._load()
+            for site, samples in new.items():
+                runs = sites.setdefault(site, [])
+                runs.extend(samples)
+                del runs[:-HISTORY]
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": time(), "sites": sites}, f, indent=2)
+            os.replace(tmp, self.path)
+
+    def record(self, site: str, seconds: float) -> None:
+        with self._lock:
+            for store in (self._history, self._new):
+                runs = store.setdefault(site, [])
+                runs.append(round(seconds, 3))
+                del runs[:-HISTORY]
+
+    # -- policy ----------------------------------------------------------------
+    def deadline(self, site: str, cap: float | None = None) -> float:
+        """Twice the slowest recent wait (plus slack), within sane bounds."""
+        cap  = cap or self.default_deadline
+        runs = self._history.get(site)
+        if not runs:
+            return cap
+        return min(cap, max(MIN_DEADLINE, 2 * max(runs) + 1))
+
+    # -- waiting ---------------------------------------------------------------
+    def wait(
+        self,
+        driver,
+        site: str,
+        selector: str,
+        deadline: float | None = None,
+        require_decoded: bool | None = None,
+        min_count: int = 1,
+        stable_for: float = STABLE_FOR,
+    ) -> ReadyResult:
+        """Poll *driver* until the chapter images are ready or time runs out.
+
+        Never raises for a slow page: callers look at ``timed_out`` and the
+        counts and decide for themselves. Only settled waits are recorded.
+        ``require_decoded`` defaults to off for URL-harvest drivers, whose
+        images are blocked on purpose.
+        """
+        if require_decoded is None:
+            require_decoded = not is_harvest(driver)
+        limit   = self.deadline(site, deadline)
+        start   = monotonic()
+        last    = -1
+        since   = start
+        count = decoded = 0
+
+        while True:
+            now = monotonic()
+            try:
+                count, decoded = driver.execute_script(
+                    _PROBE_JS, selector, LAZY_ATTRS, require_decoded
+                )
+            except Exception:
+                count, decoded = 0, 0   # navigation in flight
+
+            if count != last:
+                last, since = count, now
+
+            settled = count >= min_count and now - since >= stable_for
+            if settled and (not require_decoded or decoded >= count):
+                elapsed = now - start
+                self.record(site, elapsed)
+                return ReadyResult(count, decoded, elapsed, False)
+
+            if now - start >= limit:
+                return ReadyResult(count, decoded, now - start, True)
+            sleep(POLL)
+
+    def report(self) -> str:
+        lines = ["⏳  Page readiness (recent max / next deadline):"]
+        for site, runs in sorted(self._history.items()):
+            lines.append(f"    {site:<12} {max(runs):5.2f}s / {self.deadline(site):5.2f}s")
+        return "\n".join(lines)
+
+
+readiness = ReadinessTracker()
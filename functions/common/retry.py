@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import random
+import threading
+from time import monotonic, sleep
+from typing import Callable, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+
+T = TypeVar("T")
+
+DEFAULT_ATTEMPTS  = 4
+DEFAULT_BASE      = 1.0     # first backoff ceiling, doubled per attempt
+DEFAULT_CAP       = 30.0
+BREAKER_THRESHOLD = 5       # consecutive retryable failures per host …
+BREAKER_COOLDOWN  = 120.0   # … open the circuit for this long
+
+# HTTP statuses worth another try; every other 4xx is final
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+
+class CircuitOpen(Exception):
+    """The host failed too often recently; the call was not attempted."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        super().__init__(f"{host}: circuit open for {retry_after:.0f}s")
+        self.host        = host
+        self.retry_after = retry_after
+
+
+class FatalError(Exception):
+    """Raise (or wrap) to stop retrying immediately."""
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _chain(exc: BaseException):
+    while exc is not None:
+        yield exc
+        exc = exc.__cause__
+
+
+def circuit_open(exc: BaseException) -> CircuitOpen | None:
+    """The :class:`CircuitOpen` behind *exc*, if that is why it failed.
+
+    Such a failure says nothing about the work itself – callers should put
+    it back for later instead of counting it as failed.
+    """
+    return next((e for e in _chain(exc) if isinstance(e, CircuitOpen)), None)
+
+
+# ── per-host circuit breaker ──────────────────────────────────────────────────
+class CircuitBreaker:
+    """Fails calls to a host fast once it has failed *threshold* times in a row.
+
+    After *cooldown* seconds one trial call is let through (half-open); its
+    outcome closes the circuit again or re-opens it for another cool-down.
+    Other hosts are unaffected.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN) -> None:
+        self.threshold = threshold
+        self.cooldown  = cooldown
+        self._fails:   dict[str, int]   = {}
+        self._open:    dict[str, float] = {}   # host → monotonic() it may retry
+        self._lock     = threading.Lock()
+
+    def check(self, host: str) -> None:
+        with self._lock:
+            until = self._open.get(host)
+            if until is None:
+                return
+            if monotonic() < until:
+                raise CircuitOpen(host, until - monotonic())
+            # half-open: let this one call through, re-open on failure
+            self._open[host]  = monotonic() + self.cooldown
+            self._fails[host] = self.threshold - 1
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            self._fails.pop(host, None)
+            self._open.pop(host, None)
+
+    def failure(self, host: str) -> None:
+        with self._lock:
+            self._fails[host] = self._fails.get(host, 0) + 1
+            if self._fails[host] >= self.threshold:
+                if host not in self._open:
+                    print(f"⛔  {host}: {self._fails[host]} failures in a row, "
+                          f"pausing it for {self.cooldown:.0f}s")
+                self._open[host] = monotonic() + self.cooldown
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            return monotonic() < self._open.get(host, 0)
+
+
+breakers = CircuitBreaker()
+
+
+# ── retry policy ──────────────────────────────────────────────────────────────
+class RetryPolicy:
+    """Exponential backoff with full jitter, error classes and host breakers.
+
+    ``fatal`` adds exception types that must not be retried (e.g. "chapter
+    unavailable"); HTTP 4xx other than 408/425/429, :class:`FatalError` and
+    an open circuit are always fatal.
+    """
+
+    def __init__(
+        self,
+        attempts: int = DEFAULT_ATTEMPTS,
+        base: float = DEFAULT_BASE,
+        cap: float = DEFAULT_CAP,
+        fatal: tuple[type[BaseException], ...] = (),
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.attempts = attempts
+        self.base     = base
+        self.cap      = cap
+        self.fatal    = fatal
+        self.breaker  = breaker or breakers
+
+    def is_fatal(self, exc: BaseException) -> bool:
+        for e in _chain(exc):
+            if isinstance(e, (CircuitOpen, FatalError) + self.fatal):
+                return True
+            if isinstance(e, requests.HTTPError) and e.response is not None:
+                return e.response.status_code not in RETRYABLE_STATUS
+        return False
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number *attempt* (1-based)."""
+        return random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+    def call(self, fn: Callable[..., T], *args, host: str | None = None, **kwargs) -> T:
+        """Run ``fn(*args, **kwargs)`` under this policy.
+
+        *host* ties failures to a circuit breaker; the last error is re-raised.
+        """
+        for attempt in range(1, self.attempts + 1):
+            if host:
+                self.breaker.check(host)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                if self.is_fatal(exc):
+                    # a 4xx or a domain error is still an answer from the host:
+                    # it closes a half-open circuit like a success would
+                    if host and not any(isinstance(e, (CircuitOpen, FatalError))
+                                        for e in _chain(exc)):
+                        self.breaker.success(host)
+                    raise
+                if host:
+                    self.breaker.failure(host)
+                if attempt == self.attempts:
+                    raise
+                sleep(self.backoff(attempt))
+            else:
+                if host:
+                    self.breaker.success(host)
+                return result
+        raise AssertionError("unreachable")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+from typing import Callable, NamedTuple
+
+LOCAL = "local:"    # salt for the per-process split inside one host's shard
+
+
+def shard_of(key: str, count: int, salt: str = "") -> int:
+    """Stable shard number of *key* – same answer in every process and run.
+
+    (``hash()`` is randomised per interpreter, so it cannot be used here.)
+    """
+    digest = hashlib.blake2b(f"{salt}{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+class Shard(NamedTuple):
+    index: int    # 0-based
+    count: int
+
+    def owns(self, key: str, salt: str = "") -> bool:
+        return self.count <= 1 or shard_of(key, self.count, salt) == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index + 1}/{self.count}"
+
+
+ALL = Shard(0, 1)
+
+
+def parse_shard(text: str) -> Shard:
+    """argparse type for ``K/N`` (1-based), e.g. ``--shard 2/3`` on the second host."""
+    try:
+        k, n = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {text!r}") from None
+    if not 1 <= k <= n:
+        raise argparse.ArgumentTypeError(f"shard {text!r} out of range")
+    return Shard(k - 1, n)
+
+
+def shard_log_path(path: str, shard: Shard) -> str:
+    return f"{path}.shard-{shard.index + 1}"
+
+
+class _Prefixed:
+    """Line-prefixing stdout so interleaved shard output stays readable."""
+
+    def __init__(self, stream, prefix: str) -> None:
+        self.stream = stream
+        self.prefix = prefix
+        self._bol   = True
+
+    def write(self, text: str) -> int:
+        out = []
+        for line in text.splitlines(keepends=True):
+            out.append(f"{self.prefix}{line}" if self._bol else line)
+            self._bol = line.endswith("\n")
+        self.stream.write("".join(out))
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _shard_main(keys: list[str], shard: Shard,
+                work: Callable[[list[str], Shard], list[str] | None], conn) -> None:
+    sys.stdout = _Prefixed(sys.stdout, f"[{shard}] ")
+    errors: list[str] = []
+    try:
+        errors = list(work(keys, shard) or [])
+    except Exception as exc:
+        errors.append(f"shard {shard}: {type(exc).__name__}: {exc}")
+    finally:
+        sys.stdout.flush()
+        conn.send(errors)
+        conn.close()
+
+
+def run_sharded(
+    keys: list[str],
+    work: Callable[[list[str], Shard], list[str] | None],
+    processes: int,
+    log_path: str | None = None,
+) -> list[str]:
+    """Split *keys* across *processes* forked workers by stable hash.
+
+    ``work(keys, shard)`` runs in each worker with that shard's keys (in
+    their original order) and returns its error lines; it should open its
+    own browser, session and database handles. The errors come back merged
+    in shard order. If *log_path* is given, each shard writes to
+    :func:`shard_log_path` and those files are appended to *log_path* once
+    every worker has finished.
+    """
+    if processes <= 1:
+        return list(work(keys, ALL) or [])
+
+    ctx = multiprocessing.get_context("fork")
+    running = []
+    for i in range(processes):
+        shard = Shard(i, processes)
+        mine  = [k for k in keys if shard.owns(k, LOCAL)]
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_shard_main, args=(mine, shard, work, send),
+                           name=f"shard-{shard.index + 1}")
+        proc.start()
+        send.close()
+        running.append((shard, proc, recv, len(mine)))
+        print(f"🧩  Shard {shard}: {len(mine)} series")
+
+    errors: list[str] = []
+    for shard, proc, recv, _ in running:
+        try:
+            errors.extend(recv.recv())
+        except EOFError:
+            pass
+        proc.join()
+        if proc.exitcode:
+            errors.append(f"shard {shard}: worker exited with code {proc.exitcode}")
+
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as out:
+            for shard, *_ in running:
+                part = shard_log_path(log_path, shard)
+                if os.path.exists(part):
+                    with open(part, "r", encoding="utf-8") as f:
+                        out.write(f.read())
+                    os.remove(part)
+    return errors
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, time
+from typing import NamedTuple
+
+import requests
+
+from .image_downloader import HEADERS
+
+# Front pages probed per site; a site is up when any of its URLs answers.
+SITE_URLS: dict[str, list[str]] = {
+    "asura":       ["https://asuracomic.net"],
+    "manhuaplus":  ["https://manhuaplus.org"],
+    "yaksha":      ["https://yakshascans.com"],
+    "manhwaclan":  ["https://manhwaclan.com"],
+    "manhuaus":    ["https://manhuaus.com"],
+    "kunmanga":    ["https://kunmanga.com"],
+    "readkingdom": [f"https://ww{i}.readkingdom.com" for i in range(1, 6)],
+}
+
+PROBE_TIMEOUT = 10
+UP_INTERVAL   = 300    # re-check every 5 min while everything is up …
+DOWN_INTERVAL = 20     # … and every 20 s while some site is down
+GRACE         = 120    # default time a script waits for its site before deferring
+
+
+class SiteState(NamedTuple):
+    up:         bool
+    checked_at: float
+    since:      float     # when ``up`` last flipped
+    detail:     str
+
+
+class SiteHealth:
+    """Background availability monitor for several sites at once.
+
+    :meth:`start` probes every site concurrently once (so answers are
+    available immediately), then keeps re-probing from a daemon thread –
+    more often while something is down. Callers ask :meth:`is_up` and defer
+    work for sites that are not, instead of blocking the whole run.
+    """
+
+    def __init__(
+        self,
+        sites: dict[str, list[str]] | list[str] | None = None,
+        up_interval: float = UP_INTERVAL,
+        down_interval: float = DOWN_INTERVAL,
+        timeout: float = PROBE_TIMEOUT,
+    ) -> None:
+        if sites is None:
+            sites = SITE_URLS
+        elif isinstance(sites, list):
+            sites = {s: SITE_URLS[s] for s in sites}
+        self.sites         = sites
+        self.up_interval   = up_interval
+        self.down_interval = down_interval
+        self.timeout       = timeout
+        self._state: dict[str, SiteState] = {}
+        self._cond   = threading.Condition()
+        self._stop   = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -- probing ---------------------------------------------------------------
+    def _probe_url(self, url: str) -> str | None:
+        """``None`` if *url* is reachable, else a short reason."""
+        try:
+            res = requests.get(url, headers=HEADERS, timeout=self.timeout)
+        except requests.RequestException as exc:
+            return type(exc).__name__
+        return None if res.status_code < 400 else f"HTTP {res.status_code}"
+
+    def _probe_site(self, site: str) -> tuple[bool, str]:
+        urls = self.sites[site]
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            reasons = list(pool.map(self._probe_url, urls))
+        ok = [u for u, r in zip(urls, reasons) if r is None]
+        if ok:
+            return True, f"{len(ok)}/{len(urls)} reachable"
+        return False, ", ".join(sorted(set(reasons)))
+
+    def check_all(self) -> None:
+        with ThreadPoolExecutor(max_workers=len(self.sites)) as pool:
+            results = dict(zip(self.sites, pool.map(self._probe_site, self.sites)))
+        now = time()
+        with self._cond:
+            for site, (up, detail) in results.items():
+                old = self._state.get(site)
+                if old is None or old.up != up:
+                    print(f"{'✅' if up else '❌'}  {site}: {'up' if up else 'down'} ({detail})")
+                    since = now
+                else:
+                    since = old.since
+                self._state[site] = SiteState(up, now, since, detail)
+            self._cond.notify_all()
+
+    # -- lifecycle -------------------------------------------------------------
+    def start(self) -> "SiteHealth":
+        self.check_all()
+        self._thread = threading.Thread(target=self._run, name="site-health", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval()):
+            try:
+                self.check_all()
+            except Exception as exc:
+                print(f"⚠️  site health check failed: {exc}")
+
+    def _interval(self) -> float:
+        with self._cond:
+            any_down = any(not s.up for s in self._state.values())
+        return self.down_interval if any_down else self.up_interval
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def __enter__(self) -> "SiteHealth":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+    # -- queries ---------------------------------------------------------------
+    def is_up(self, site: str) -> bool:
+        """Unknown sites count as up – the monitor never blocks unrelated work."""
+        with self._cond:
+            state = self._state.get(site)
+        return state is None or state.up
+
+    def down_sites(self) -> list[str]:
+        with self._cond:
+            return sorted(s for s, st in self._state.items() if not st.up)
+
+    def wait_until_up(self, site: str, timeout: float = GRACE) -> bool:
+        """Block the *calling* thread until *site* is up or *timeout* passes."""
+        deadline = monotonic() + timeout
+        with self._cond:
+            while not self._stop.is_set():
+                state = self._state.get(site)
+                if state is None or state.up:
+                    return True
+                left = deadline - monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+        return self.is_up(site)
+
+    def wait_any_up(self, sites: list[str], timeout: float) -> list[str]:
+        """Wait until at least one of *sites* is up; returns those that are."""
+        deadline = monotonic() + timeout
+        with self._cond:
+            while True:
+                up = [s for s in sites if s not in self._state or self._state[s].up]
+                left = deadline - monotonic()
+                if up or left <= 0 or self._stop.is_set():
+                    return up
+                self._cond.wait(left)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class IncompleteDownload(Exception):
+    """The body ended before ``Content-Length`` bytes arrived."""
+
+
+class StreamResult(NamedTuple):
+    bytes:  int
+    digest: str | None
+
+
+def stream_to_file(
+    resp: requests.Response,
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    hash_name: str | None = None,
+) -> StreamResult:
+    """Write a ``stream=True`` response to *path* atomically.
+
+    Chunks go to a hidden temp file next to *path*; only once the byte count
+    matches ``Content-Length`` is it renamed over *path*. A dropped connection
+    therefore never leaves a truncated file under the final name.
+    """
+    expected = resp.headers.get("Content-Length")
+    encoded  = resp.headers.get("Content-Encoding", "identity") != "identity"
+    hasher   = hashlib.new(hash_name) if hash_name else None
+
+    folder, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=folder or ".", prefix=f".{name}.", suffix=".part")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                written += len(chunk)
+                if hasher:
+                    hasher.update(chunk)
+
+        # requests transparently decodes gzip/deflate, so only raw bodies
+        # can be compared with the header.
+        if expected is not None and not encoded and written != int(expected):
+            raise IncompleteDownload(
+                f"{resp.url}: got {written} of {expected} bytes"
+            )
+        if written == 0:
+            raise IncompleteDownload(f"{resp.url}: empty body")
+
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    return StreamResult(written, hasher.hexdigest() if hasher else None)
+
+
+def adopt_file(
+    tmp: str,
+    path: str,
+    hash_name: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> StreamResult:
+    """Rename an already complete temp file (e.g. a spooled browser capture)
+    over *path*; *tmp* must be on the same filesystem."""
+    size = os.path.getsize(tmp)
+    if not size:
+        os.remove(tmp)
+        raise IncompleteDownload(f"{path}: empty body")
+    digest = None
+    if hash_name:
+        hasher = hashlib.new(hash_name)
+        with open(tmp, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+    os.replace(tmp, path)
+    return StreamResult(size, digest)
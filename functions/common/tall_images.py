@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import Iterator
+
+from PIL import Image
+
+BAND_ROWS  = 1024           # rows inflated/decoded per step on the banded path
+READ_BYTES = 1 << 20
+
+# 8-bit, non-interlaced PNG layouts the banded path understands → bytes/pixel
+_PNG_BPP = {"L": 1, "P": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+
+
+def iter_slices(path, slice_height: int) -> Iterator[Image.Image]:
+    """Yield RGB slices of at most *slice_height* rows, top to bottom.
+
+    Output is identical to ``Image.open(path).convert("RGB").crop(...)`` per
+    slice, but memory stays bounded:
+
+    * 8-bit non-interlaced PNGs are inflated and decoded ``BAND_ROWS`` rows
+      at a time, so only the current slice is ever held in full;
+    * everything else (JPEG, 16-bit/interlaced PNG, …) has to be decoded in
+      one go, but stays in its native mode – only one slice at a time is
+      converted to RGB, instead of a second full-size RGB copy.
+    """
+    with Image.open(path) as img:
+        if _png_bandable(img):
+            yield from _png_slices(path, img, slice_height)
+        else:
+            yield from _crop_slices(img, slice_height)
+
+
+def _crop_slices(img: Image.Image, slice_height: int) -> Iterator[Image.Image]:
+    width, height = img.size
+    for top in range(0, height, slice_height):
+        part = img.crop((0, top, width, min(top + slice_height, height)))
+        yield part if part.mode == "RGB" else part.convert("RGB")
+
+
+# ── banded PNG ────────────────────────────────────────────────────────────────
+def _png_bandable(img: Image.Image) -> bool:
+    if img.format != "PNG" or len(img.tile) != 1 or img.info.get("interlace"):
+        return False
+    tile = img.tile[0]
+    return tile[0] == "zip" and img.mode in _PNG_BPP and tile[3] == img.mode
+
+
+def _idat_chunks(path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(8)                                  # PNG signature
+        seen_idat = False
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            length, kind = struct.unpack(">I4s", header)
+            if kind != b"IDAT":
+                if seen_idat or kind == b"IEND":
+                    return
+                f.seek(length + 4, 1)              # data + CRC
+                continue
+            seen_idat = True
+            left = length
+            while left:
+                piece = f.read(min(left, READ_BYTES))
+                if not piece:
+                    return
+                left -= len(piece)
+                yield piece
+            f.seek(4, 1)
+
+
+def _filtered_blocks(path, block_bytes: int) -> Iterator[bytes]:
+    """Inflate the IDAT stream in *block_bytes* pieces (last may be shorter)."""
+    z       = zlib.decompressobj()
+    chunks  = _idat_chunks(path)
+    pending = bytearray()
+    tail    = b""
+    done    = False
+    while not done or pending:
+        while len(pending) < block_bytes and not done:
+            if not tail:
+                tail = next(chunks, b"")
+                if not tail:
+                    pending += z.flush()
+                    done = True
+                    break
+            pending += z.decompress(tail, block_bytes - len(pending))
+            tail = z.unconsumed_tail
+        if not pending:
+            return
+        block = bytes(pending[:block_bytes])
+        del pending[:block_bytes]
+        yield block
+
+
+def _png_slices(path, img: Image.Image, slice_height: int) -> Iterator[Image.Image]:
+    width, height = img.size
+    mode     = img.mode
+    stride   = width * _PNG_BPP[mode]
+    row      = stride + 1                          # filter byte + pixels
+    palette  = img.getpalette() if mode == "P" else None
+    previous = bytes(stride)                       # the row "above" row 0 is zeros
+
+    out, filled = None, 0
+    blocks = _filtered_blocks(path, BAND_ROWS * row)
+    for top in range(0, height, BAND_ROWS):
+        rows  = min(BAND_ROWS, height - top)
+        block = next(blocks, b"")
+        if len(block) < rows * row:
+            raise OSError(f"{path}: truncated PNG data at row {top}")
+
+        # prepend the previous (already unfiltered) row with filter "None",
+        # so Up/Average/Paeth on the first real row see the right neighbour
+        data = zlib.compress(b"\0" + previous + block, 0)
+        band = Image.frombytes(mode, (width, rows + 1), data, "zip", mode)
+        previous = band.crop((0, rows, width, rows + 1)).tobytes()
+        band = band.crop((0, 1, width, rows + 1))
+        if palette is not None:
+            band.putpalette(palette)
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+
+        used = 0                                   # rows of this band already placed
+        while used < rows:
+            if out is None:
+                out, filled = Image.new("RGB", (width, min(slice_height, height - top - used))), 0
+            take = min(rows - used, out.height - filled)
+            out.paste(band.crop((0, used, width, used + take)), (0, filled))
+            filled += take
+            used   += take
+            if filled == out.height:
+                yield out
+                out = None
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+# "URL-harvest" mode: for pages where only the DOM is needed (image URLs read
+# from src / data-src), Chrome is told not to fetch anything heavy. Blocking
+# happens at the network layer, so the attributes stay exactly as the site
+# wrote them – the <img> elements just never decode.
+
+# Chrome's blocked-URL patterns only know "*", so every pattern is anchored:
+# extensions at the end of the path (optionally followed by a query string),
+# hosts by scheme and domain – never a bare substring that could also match a
+# chapter page or script whose URL merely contains ".ico" or a tracker name.
+BLOCKED_EXTS = (
+    # images
+    "jpg", "jpeg", "png", "webp", "gif", "avif", "bmp", "ico",
+    # media
+    "mp4", "webm", "m3u8", "mp3",
+    # fonts
+    "woff", "woff2", "ttf", "otf", "eot",
+)
+BLOCKED_HOSTS = (
+    # ads / trackers
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com",
+    "google-analytics.com", "adservice.google.*", "facebook.net",
+    "hotjar.com", "cloudflareinsights.com", "disqus.com",
+    "popads.net", "popcash.net", "propellerads.com", "adsterra.com",
+    "exoclick.com", "juicyads.com", "mgid.com", "taboola.com",
+    "outbrain.com", "histats.com",
+)
+
+
+def _ext_patterns(ext: str) -> list[str]:
+    return [f"*.{e}{tail}" for e in (ext, ext.upper()) for tail in ("", "?*")]
+
+
+def _host_patterns(host: str) -> list[str]:
+    return [f"*://{host}/*", f"*://*.{host}/*"]
+
+
+BLOCKED_URLS = (
+    [p for ext in BLOCKED_EXTS for p in _ext_patterns(ext)]
+    + [p for host in BLOCKED_HOSTS for p in _host_patterns(host)]
+    + ["*://mc.yandex.ru/metrika/*"]
+)
+
+
+def enable_harvest(driver, extra: list[str] | None = None):
+    """Block images, media, fonts and ad/tracker hosts for *driver*.
+
+    Marks the driver so ``readiness.wait`` stops waiting for images to
+    decode. Returns the driver for use inside a ``start_browser`` factory.
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS + (extra or [])})
+    driver.harvest_mode = True
+    return driver
+
+
+def is_harvest(driver) -> bool:
+    return getattr(driver, "harvest_mode", False)
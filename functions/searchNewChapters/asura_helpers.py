@@ -1,63 +1,83 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
 
 import requests
 from bs4 import BeautifulSoup
 
+from . import config
+from .http_cache import cache
+from .slug_index import SlugIndex
+
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 BASE_URL = "https://asuracomic.net"
 
 
-def fetch_asura_series_url(name: str) -> str:
-    # Clean the input name to match the format in href
-    slug = name.lower().replace("-", "").replace(" ", "")
+def _normalize_slug(slug: str) -> str:
+    # "/series/nano-machine-5c2f1a7b" and "nano-machine" → "nanomachine"
+    slug = unquote(slug).lower().rstrip("/").rsplit("/", 1)[-1]
+    slug = re.sub(r"-[0-9a-f]{8}$", "", slug)
+    return slug.replace("-", "").replace(" ", "")
+
 
-    def scan_one(url: str):
+def _crawl_listing() -> dict[str, str]:
+    """One pass over the home page and /page/1..6 → ``{href: series_url}``."""
+    def scan_one(url: str) -> dict[str, str]:
         try:
             res = requests.get(url, headers=HEADERS, timeout=10)
             res.raise_for_status()
         except Exception as e:
             print(f"❌ Failed to load {url}: {e}")
-            return None
+            return {}
 
         soup = BeautifulSoup(res.text, "html.parser")
 
         # Find span with class "text-[15px] font-medium", then <a href="/series/...">
         a_tags = soup.select("span.text-\\[15px\\].font-medium a[href^='/series/']")
+        return {a["href"]: BASE_URL + a["href"] for a in a_tags}
 
-        for a in a_tags:
-            href_clean = unquote(a["href"]).lower().replace("-", "").replace(" ", "")
-            if slug in href_clean:
-                return BASE_URL + a["href"]
+    pages = [BASE_URL] + [f"{BASE_URL}/page/{i}" for i in range(1, 7)]
+    found: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=len(pages)) as pool:
+        for part in pool.map(scan_one, pages):
+            found.update(part)
+    return found
 
-        return None
 
-    # Try home page and up to 6 paginated pages
-    for i in range(0, 7):
-        url = BASE_URL if i == 0 else f"{BASE_URL}/page/{i}"
-        found = scan_one(url)
-        if found:
-            return found
+asura_index = SlugIndex(
+    config.index_dir / "asura_series.json",
+    crawl=_crawl_listing,
+    normalize=_normalize_slug,
+    max_age=config.asura_index_max_age,
+)
 
+
+def fetch_asura_series_url(name: str, stale_url: str | None = None) -> str:
+    url = asura_index.lookup(name, stale_url)
+    if url:
+        return url
     raise Exception(f"Series page not found on Asura for '{name}'")
 
 def extract_asura_latest_chapter(series_url: str) -> int | None:
-    res = requests.get(series_url, headers=HEADERS, timeout=10)
-    res.raise_for_status()
+    def select(soup):
+        container = soup.select_one("div.grid.grid-cols-2.px-4.py-4.gap-2\\.5")
+        return [container] if container else []
 
-    soup = BeautifulSoup(res.text, "html.parser")
+    def extract(containers):
+        if not containers:
+            print("❌ Could not find the chapter container.")
+            return None
 
-    container = soup.select_one("div.grid.grid-cols-2.px-4.py-4.gap-2\\.5")
-    if not container:
-        print("❌ Could not find the chapter container.")
-        return None
+        links = containers[0].select("a[href*='/chapter/']")
 
-    links = container.select("a[href*='/chapter/']")
+        chapter_nums = [
+            int(m.group(1))
+            for a in links
+            if (m := re.search(r"/chapter/(\d+)", a["href"]))
+        ]
 
-    chapter_nums = [
-        int(m.group(1))
-        for a in links
-        if (m := re.search(r"/chapter/(\d+)", a["href"]))
-    ]
+        return max(chapter_nums) if chapter_nums else None
 
-    return max(chapter_nums) if chapter_nums else None
+    return cache.latest("asura", series_url, select=select, extract=extract,
+                        fragment=r'href="[^"]*/chapter/\d+[^"]*"',
+                        raise_for_status=True)
@@ -1,6 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from . import local_chapters, asura_helpers, site_lookups
+from . import config, local_chapters, asura_helpers, site_lookups
 
 
 def check_online_chapter(series_name: str, entry: dict) -> tuple[int | None, int | None]:
@@ -22,7 +24,7 @@ def check_online_chapter(series_name: str, entry: dict) -> tuple[int | None, int
         if online is None:
             # try to repair missing / wrong URL
             try:
-                entry["url"] = asura_helpers.fetch_asura_series_url(series_name)
+                entry["url"] = asura_helpers.fetch_asura_series_url(series_name, url)
                 online = asura_helpers.extract_asura_latest_chapter(entry["url"])
             except Exception as e:
                 print(f"❌ Asura lookup failed for {series_name}: {e}")
@@ -37,3 +39,47 @@ def check_online_chapter(series_name: str, entry: dict) -> tuple[int | None, int
             online = None
 
     return local, online
+
+
+# ── async mode ────────────────────────────────────────────────────────────────
+# The lookups themselves stay blocking (requests + BeautifulSoup); each one runs
+# on a worker thread so fetching *and* parsing happen off the event loop, while
+# semaphores keep every site – and the run as a whole – under its cap.
+async def check_online_chapter_async(
+    series_name: str,
+    entry: dict,
+    global_sem: asyncio.Semaphore,
+    site_sems: dict[str, asyncio.Semaphore],
+    executor: ThreadPoolExecutor,
+) -> tuple[int | None, int | None]:
+    site = entry.get("site", "unknown")
+    if site not in site_sems:
+        site_sems[site] = asyncio.Semaphore(
+            config.site_concurrency.get(site, config.default_site_concurrency)
+        )
+
+    async with site_sems[site], global_sem:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                executor, check_online_chapter, series_name, entry
+            )
+        except Exception as e:
+            print(f"❌ {site} - {series_name}: {e}")
+            return None, None
+
+
+async def check_all_async(jobs: list[tuple[str, dict]]) -> list[tuple[int | None, int | None]]:
+    """Check every ``(series_name, entry)`` concurrently; results keep *jobs* order."""
+    global_sem = asyncio.Semaphore(config.global_concurrency)
+    site_sems: dict[str, asyncio.Semaphore] = {}
+
+    with ThreadPoolExecutor(max_workers=config.global_concurrency) as executor:
+        return await asyncio.gather(*(
+            check_online_chapter_async(name, entry, global_sem, site_sems, executor)
+            for name, entry in jobs
+        ))
+
+
+def check_all(jobs: list[tuple[str, dict]]) -> list[tuple[int | None, int | None]]:
+    return asyncio.run(check_all_async(jobs))
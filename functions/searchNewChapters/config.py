@@ -6,6 +6,29 @@ from pathlib import Path
 json_path   = Path("/home/ubuntu/server-backend/json/manhwa_list.json")
 pictures_path = Path("~/backend/pictures").expanduser()
 log_dir       = Path("~/backend/logs/searchNewChapters").expanduser()
+cache_dir     = Path("~/backend/cache/searchNewChapters").expanduser()
+index_dir     = Path("~/backend/cache/indexes").expanduser()
+
+# ── async checker limits (requests in flight) ─────────────────────────────────
+global_concurrency = 16
+site_concurrency   = {
+    "asura":       4,
+    "manhuaplus":  4,
+    "yaksha":      3,
+    "kunmanga":    3,
+    "manhwaclan":  3,
+    "readkingdom": 1,
+}
+default_site_concurrency = 2
+
+# ── series-page cache ─────────────────────────────────────────────────────────
+cache_ttl       = 10 * 60                 # seconds a page is trusted without asking
+cache_site_ttl  = {"readkingdom": 30 * 60}
+cache_max_bytes = 64 * 1024 * 1024
+
+# ── slug → series URL indexes ────────────────────────────────────────────────
+asura_index_max_age        = 24 * 60 * 60
+manhuaplus_catalog_max_age = 24 * 60 * 60
 
 # ── tiny helpers ──────────────────────────────────────────────────────────────
 def load_manhwa_list() -> dict:
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+import requests
+from bs4 import BeautifulSoup
+
+from . import config
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class ResponseCache:
+    """On-disk cache of series pages plus the chapter number parsed from them.
+
+    * within the TTL a page is not requested at all (``hit``);
+    * after it, the request carries ``If-None-Match`` / ``If-Modified-Since``
+      and a ``304`` keeps the stored answer (``revalidated``);
+    * a ``200`` whose chapter-list fragment hashes the same as last time also
+      keeps the stored answer (``unchanged``) – the fragment is found with a
+      regex on the raw text, so only real changes build a soup and extract.
+    """
+
+    def __init__(self, root: Path, ttl: float, site_ttl: dict, max_bytes: int) -> None:
+        self.root      = root
+        self.ttl       = ttl
+        self.site_ttl  = site_ttl
+        self.max_bytes = max_bytes
+        self.stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    # ── entry storage ─────────────────────────────────────────────────────────
+    def _path(self, url: str) -> Path:
+        return self.root / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+    def _load(self, url: str) -> dict | None:
+        try:
+            with self._path(url).open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, url: str, entry: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(url)
+        tmp  = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def _count(self, site: str, outcome: str) -> None:
+        with self._lock:
+            self.stats[site][outcome] += 1
+
+    # ── main entry point ──────────────────────────────────────────────────────
+    def latest(
+        self,
+        site: str,
+        url: str,
+        select: Callable[[BeautifulSoup], list],
+        extract: Callable[[list], int | None],
+        fragment: str | re.Pattern | None,
+        raise_for_status: bool = False,
+    ) -> int | None:
+        """Return the latest chapter of *url*, parsing the page only if needed.
+
+        ``fragment`` matches the chapter-list markup in the raw page (all
+        matches are hashed), ``select`` picks the chapter-list tags out of
+        the parsed page and ``extract`` turns those tags into a chapter number.
+        The fragment must cover everything ``extract`` reads; ``None`` parses
+        every fresh page. A page with no match at all is always parsed, so a
+        layout change or a challenge page can't pin an old result.
+        """
+        entry = self._load(url)
+        if entry and "result" not in entry:
+            entry = None                      # written by an older version
+        now   = time.time()
+        ttl   = self.site_ttl.get(site, self.ttl)
+
+        if entry and now - entry["fetched_at"] < ttl:
+            self._count(site, "hit")
+            return entry["result"]
+
+        headers = dict(HEADERS)
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        res = requests.get(url, headers=headers, timeout=10)
+
+        if res.status_code == 304 and entry:
+            entry["fetched_at"] = now
+            self._store(url, entry)
+            self._count(site, "revalidated")
+            return entry["result"]
+
+        if raise_for_status:
+            res.raise_for_status()
+        if res.status_code != 200:
+            self._count(site, "miss")
+            return extract(select(BeautifulSoup(res.text, "html.parser")))
+
+        fragment_hash = None
+        if fragment is not None:
+            digest, matched = hashlib.sha1(), False
+            for m in re.finditer(fragment, res.text):
+                digest.update(m.group(0).encode("utf-8"))
+                matched = True
+            if matched:
+                fragment_hash = digest.hexdigest()
+
+        if fragment_hash and entry and entry.get("fragment_hash") == fragment_hash:
+            self._count(site, "unchanged")
+            result = entry["result"]
+        else:
+            self._count(site, "miss")
+            result = extract(select(BeautifulSoup(res.text, "html.parser")))
+
+        self._store(url, {
+            "url":           url,
+            "etag":          res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified"),
+            "fetched_at":    now,
+            "fragment_hash": fragment_hash,
+            "result":        result,
+        })
+        return result
+
+    # ── housekeeping ──────────────────────────────────────────────────────────
+    def evict(self) -> None:
+        """Drop the least recently refreshed entries until under ``max_bytes``."""
+        if not self.root.exists():
+            return
+        files = []
+        for p in self.root.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def report(self) -> None:
+        if not self.stats:
+            return
+        print("\n🗄️  Page cache:")
+        for site in sorted(self.stats):
+            s = self.stats[site]
+            print(
+                f"   {site}: {s['hit']} hit, {s['revalidated']} revalidated, "
+                f"{s['unchanged']} unchanged, {s['miss']} miss"
+            )
+
+
+cache = ResponseCache(
+    config.cache_dir,
+    ttl=config.cache_ttl,
+    site_ttl=config.cache_site_ttl,
+    max_bytes=config.cache_max_bytes,
+)
@@ -1,26 +1,36 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
 
 import requests
 from bs4 import BeautifulSoup
 
+from . import config
+from .http_cache import cache
+from .slug_index import SlugIndex
+
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
+# chapter-list markup hashed by the page cache to spot unchanged pages
+MADARA_CHAPTER_LINKS = re.compile(r'wp-manga-chapter[^>]*>\s*<a href="[^"]*"')
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 def yaksha_latest(slug: str, _entry: dict) -> int | None:
     url = f"https://yakshascans.com/manga/{slug}"
     try:
-        res = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-        links = soup.select("li.wp-manga-chapter a[href*='/chapter-']")
-        return max(
-            (
-                int(m.group(1))
-                for link in links
-                if (m := re.search(r"/chapter-(\d{1,4})", link.get("href", "")))
+        return cache.latest(
+            "yaksha", url,
+            fragment=MADARA_CHAPTER_LINKS,
+            select=lambda soup: soup.select("li.wp-manga-chapter a[href*='/chapter-']"),
+            extract=lambda links: max(
+                (
+                    int(m.group(1))
+                    for link in links
+                    if (m := re.search(r"/chapter-(\d{1,4})", link.get("href", "")))
+                ),
+                default=None,
             ),
-            default=None,
         )
     except Exception as e:
         print(f"❌ yaksha - {slug}: {e}")
@@ -31,16 +41,18 @@ def yaksha_latest(slug: str, _entry: dict) -> int | None:
 def kunmanga_latest(slug: str, _entry: dict) -> int | None:
     url = f"https://kunmanga.com/manga/{slug}/"
     try:
-        res = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-        links = soup.select("li.wp-manga-chapter a[href*='/chapter-']")
-        return max(
-            (
-                int(m.group(1))
-                for link in links
-                if (m := re.search(r"chapter-(\d{1,4})", link.get("href", "")))
+        return cache.latest(
+            "kunmanga", url,
+            fragment=MADARA_CHAPTER_LINKS,
+            select=lambda soup: soup.select("li.wp-manga-chapter a[href*='/chapter-']"),
+            extract=lambda links: max(
+                (
+                    int(m.group(1))
+                    for link in links
+                    if (m := re.search(r"chapter-(\d{1,4})", link.get("href", "")))
+                ),
+                default=None,
             ),
-            default=None,
         )
     except Exception as e:
         print(f"❌ kunmanga - {slug}: {e}")
@@ -51,16 +63,18 @@ def kunmanga_latest(slug: str, _entry: dict) -> int | None:
 def manhwaclan_latest(slug: str, _entry: dict) -> int | None:
     url = f"https://manhwaclan.com/manga/{slug}/"
     try:
-        res = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-        links = soup.select("div.listing-chapters_wrap a[href*='/chapter-']")
-        return max(
-            (
-                int(m.group(1))
-                for link in links
-                if (m := re.search(r"/chapter-(\d+)", link.get("href", "")))
+        return cache.latest(
+            "manhwaclan", url,
+            fragment=r'href="[^"]*/chapter-\d+[^"]*"',
+            select=lambda soup: soup.select("div.listing-chapters_wrap a[href*='/chapter-']"),
+            extract=lambda links: max(
+                (
+                    int(m.group(1))
+                    for link in links
+                    if (m := re.search(r"/chapter-(\d+)", link.get("href", "")))
+                ),
+                default=None,
             ),
-            default=None,
         )
     except Exception as e:
         print(f"❌ manhwaclan - {slug}: {e}")
@@ -68,48 +82,76 @@ def manhwaclan_latest(slug: str, _entry: dict) -> int | None:
 
 
 # ──────────────────────────────────────────────────────────────────────────────
+def _manhuaplus_slug(slug: str) -> str:
+    # "https://manhuaplus.org/manga/nano-machine056541" and "Nano Machine" → "nano-machine"
+    slug = slug.lower().rstrip("/").rsplit("/", 1)[-1].replace(" ", "-").replace("_", "-")
+    return re.sub(r"(?<=[a-z])\d{4,}$", "", slug)
+
+
+def _crawl_manhuaplus_catalog() -> dict[str, str]:
+    """Fetch all-manga/1..10 concurrently → ``{series_url: series_url}``."""
+    base = "https://manhuaplus.org/all-manga/"
+
+    def scan_page(page: int) -> list[str]:
+        try:
+            res = requests.get(f"{base}{page}", headers=HEADERS, timeout=10)
+        except Exception as e:
+            print(f"❌ manhuaplus catalog page {page}: {e}")
+            return []
+        soup = BeautifulSoup(res.text, "html.parser")
+        grid = soup.select_one("div.grid.gtc-f141a.gg-20.p-13.mh-77vh")
+        if not grid:
+            return []
+        urls = []
+        for div in grid.find_all("div", recursive=False):
+            a = div.find("a", href=True)
+            if not a:
+                continue
+            if (m := re.match(r"(https://manhuaplus\.org/manga/[^/]+)", a["href"].lower())):
+                urls.append(m.group(1))
+        return urls
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        return {u: u for page in pool.map(scan_page, range(1, 11)) for u in page}
+
+
+manhuaplus_catalog = SlugIndex(
+    config.index_dir / "manhuaplus_catalog.json",
+    crawl=_crawl_manhuaplus_catalog,
+    normalize=_manhuaplus_slug,
+    max_age=config.manhuaplus_catalog_max_age,
+)
+
+
 def manhuaplus_latest(slug: str, entry: dict) -> int | None:
     try:
         # ── Part 1 – find URL if needed ───────────────────────────────────────
         url = entry.get("url")
         if not url:
-            search_slug = slug.lower().replace(" ", "-").replace("_", "-")
-            base = "https://manhuaplus.org/all-manga/"
-            for page in range(1, 11):
-                res = requests.get(f"{base}{page}", headers=HEADERS, timeout=10)
-                soup = BeautifulSoup(res.text, "html.parser")
-                grid = soup.select_one("div.grid.gtc-f141a.gg-20.p-13.mh-77vh")
-                if not grid:
-                    continue
-                for div in grid.find_all("div", recursive=False):
-                    a = div.find("a", href=True)
-                    if not a:
-                        continue
-                    href = a["href"].lower()
-                    if "/manga/" in href and search_slug in href:
-                        m = re.match(r"(https://manhuaplus\.org/manga/[^/]+)", href)
-                        if m:
-                            url = m.group(1)
-                            entry["url"] = url
-                            break
-                if url:
-                    break
+            url = manhuaplus_catalog.lookup(slug)
+            if url:
+                entry["url"] = url
         if not url:
             print(f"❌ manhuaplus - {slug}: Series URL not found.")
             return None
 
         # ── Part 2 – find latest chapter from 'comicBtn' ─────────────────────
-        res = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        latest_button = soup.find("a", class_="comicBtn mb-6 fs-13 r4 i-block w-m2p4 is-primary")
-        if latest_button and (href := latest_button.get("href", "")):
-            # Extract the chapter number from the href
-            if (m := re.search(r"/chapter-(\d+)", href, re.IGNORECASE)):
-                return int(m.group(1))
+        def select(soup):
+            button = soup.find("a", class_="comicBtn mb-6 fs-13 r4 i-block w-m2p4 is-primary")
+            return [button] if button else []
+
+        def extract(buttons):
+            if buttons and (href := buttons[0].get("href", "")):
+                # Extract the chapter number from the href
+                if (m := re.search(r"/chapter-(\d+)", href, re.IGNORECASE)):
+                    return int(m.group(1))
+            return None
 
-        print(f"❌ manhuaplus - {slug}: Could not find latest chapter button.")
-        return None
+        latest = cache.latest("manhuaplus", url, select=select, extract=extract,
+                              fragment=r'<a[^>]*class="comicBtn[^"]*"[^>]*>')
+        if latest is None:
+            print(f"❌ manhuaplus - {slug}: Could not find latest chapter button.")
+        return latest
 
     except Exception as e:
         print(f"❌ manhuaplus - {slug}: {e}")
@@ -119,11 +161,8 @@ def manhuaplus_latest(slug: str, entry: dict) -> int | None:
 # ──────────────────────────────────────────────────────────────────────────────
 def readkingdom_latest(_slug: str, _entry: dict) -> int | None:
     url = "https://ww5.readkingdom.com/manga/kingdom/"
-    try:
-        res = requests.get(url, headers=HEADERS, timeout=10)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
-        blocks = soup.select("div.bg-bg-secondary.p-3.rounded.mb-3.shadow")
+
+    def extract(blocks):
         chapters = []
         for div in blocks:
             a = div.select_one("a[href*='kingdom-chapter-']")
@@ -133,6 +172,15 @@ def readkingdom_latest(_slug: str, _entry: dict) -> int | None:
             if (m := re.search(r"kingdom-chapter-(\d{1,4})", a["href"])):
                 chapters.append(int(m.group(1)))
         return max(chapters) if chapters else None
+
+    try:
+        return cache.latest(
+            "readkingdom", url,
+            fragment=None,                 # extract also reads the release label
+            select=lambda soup: soup.select("div.bg-bg-secondary.p-3.rounded.mb-3.shadow"),
+            extract=extract,
+            raise_for_status=True,
+        )
     except Exception as e:
         print(f"❌ readkingdom: {e}")
         return None
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+
+class SlugIndex:
+    """Persistent ``normalized slug → series URL`` map built from listing pages.
+
+    ``crawl`` walks the site's listing once and returns ``{href_slug: url}``;
+    ``normalize`` turns both those slugs and lookup names into the same key.
+    The map is rebuilt when older than ``max_age`` and at most once per run
+    on a miss, so a run with many broken entries still costs a single crawl.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        crawl: Callable[[], dict[str, str]],
+        normalize: Callable[[str], str],
+        max_age: float,
+    ) -> None:
+        self.path      = path
+        self.crawl     = crawl
+        self.normalize = normalize
+        self.max_age   = max_age
+
+        self._entries: dict[str, dict] | None = None
+        self._built_at = 0.0
+        self._refreshed = False
+        self._lock = threading.Lock()
+
+    # ── storage ───────────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries  = data.get("entries", {})
+            self._built_at = data.get("built_at", 0.0)
+        except (OSError, ValueError):
+            self._entries, self._built_at = {}, 0.0
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"built_at": self._built_at, "entries": self._entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _refresh(self) -> None:
+        now = time.time()
+        found = self.crawl()
+        for slug, url in found.items():
+            self._entries[self.normalize(slug)] = {"url": url, "seen_at": now}
+        self._built_at  = now
+        self._refreshed = True
+        self._save()
+        print(f"🗂️  {self.path.stem}: indexed {len(found)} series ({len(self._entries)} total)")
+
+    def _find(self, key: str, stale_url: str | None) -> str | None:
+        hit = self._entries.get(key)
+        if hit and hit["url"] != stale_url:
+            return hit["url"]
+        for k, e in self._entries.items():
+            if key in k and e["url"] != stale_url:
+                return e["url"]
+        return None
+
+    # ── public ────────────────────────────────────────────────────────────────
+    def lookup(self, name: str, stale_url: str | None = None) -> str | None:
+        """Return the series URL for *name*, never *stale_url*."""
+        key = self.normalize(name)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if not self._refreshed and time.time() - self._built_at > self.max_age:
+                self._refresh()
+
+            found = self._find(key, stale_url)
+            if found is None and not self._refreshed:
+                self._refresh()
+                found = self._find(key, stale_url)
+            return found
@@ -2,21 +2,38 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
+import shutil
 import requests
-from time import sleep, time
+from time import time
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 
-# ── kill any stale chrome processes ────────────────────────────────────────────
-for proc in ["chrome", "chromedriver", "chromium", "HeadlessChrome", "selenium"]:
-    os.system(f"pkill -f {proc}")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.image_downloader import ImageDownloader, ChapterDownloadError
+from functions.Manhuaplus_scrape.browser_pool import BrowserPool
+from functions.common.library_index import open_library
+from functions.common.readiness import readiness
+from functions.common.network_capture import enable_capture, drain, capture_image_bodies
+from functions.common.url_harvest import enable_harvest
+from functions.common.mirrors import MirrorResolver
+from functions.common.latest_chapter import resolve_latest, url_exists
+from functions.common.retry import RetryPolicy, host_of
+from functions.common.site_health import SiteHealth
+from functions.common.browser_supervisor import start_chrome, supervisor
+from functions.searchNewChapters.site_lookups import readkingdom_latest
+
+# ── reap chrome left by crashed runs (never another scraper's) ─────────────────
+supervisor.reap_orphans()
 
 # ── user‑config ────────────────────────────────────────────────────────────────
 manga_name   = "kingdom"
 chapter_slug = "kingdom-chapter"
+PAGE_SELECTOR = "img.mb-3.mx-auto.js-page"
+PAGE_DEADLINE = 5   # the page list is in the HTML; this used to be a flat sleep(2)
 base_domains = [
     "https://ww1.readkingdom.com",
     "https://ww2.readkingdom.com",
@@ -41,51 +58,43 @@ chrome_opts.add_argument("--window-size=1920x1080")
 chrome_opts.add_argument("--no-sandbox")
 chrome_opts.add_argument("--disable-dev-shm-usage")
 chrome_opts.add_argument("--user-agent=Mozilla/5.0")
-
-def start_browser():
-    return webdriver.Chrome(options=chrome_opts)
-
-driver  = start_browser()
-session = requests.Session()
-headers = {"User-Agent": "Mozilla/5.0"}
+enable_capture(chrome_opts)   # reuse the page images Chrome already loaded
+
+def start_browser(harvest=False):
+    # capture mode (default) keeps the page images Chrome loads; harvest mode
+    # blocks them when only the URLs are wanted
+    driver = start_chrome(chrome_opts)
+    return enable_harvest(driver) if harvest else driver
+
+pool       = BrowserPool(factory=start_browser)
+session    = requests.Session()
+downloader = ImageDownloader()
+policy     = RetryPolicy(attempts=3)
+mirrors    = MirrorResolver(
+    "readkingdom",
+    base_domains,
+    [f"{chapter_slug}-{{n:03d}}", f"{chapter_slug}-{{n}}"],
+    session=session,
+)
 
 start_time  = time()
 total_bytes = 0
 log_lines   = []
-working_dom = None
-
-# ── helper: dir size in GiB ────────────────────────────────────────────────────
-def dir_size_gib(path: str) -> float:
-    total = 0
-    for dpath, _, files in os.walk(path):
-        for f in files:
-            try:
-                total += os.path.getsize(os.path.join(dpath, f))
-            except OSError:
-                continue
-    return round(total / 1024 / 1024 / 1024, 5)
 
 # ── helper: scrape one chapter url ─────────────────────────────────────────────
-def try_download(ch_url: str) -> list[str]:
-    try:
-        res = session.head(
-            ch_url,
-            headers=headers,
-            allow_redirects=True,   # follow 301/302
-            timeout=5
-        )
-        if res.status_code != 200:
-            return []
-
-        driver.set_page_load_timeout(60)
+def _render_chapter(ch_url: str, chapter_dir: str) -> tuple[list[str], dict[str, str]]:
+    with pool.lease() as driver:
+        drain(driver)
         try:
             driver.get(ch_url)
         except TimeoutException:
             driver.execute_script("window.stop()")  # keep partial HTML
 
-        sleep(2)  # let DOM settle
+        # only the src list is needed – pages Chrome did not finish are fetched over HTTP
+        readiness.wait(driver, "readkingdom", PAGE_SELECTOR,
+                       deadline=PAGE_DEADLINE, require_decoded=False)
 
-        imgs = driver.find_elements(By.CSS_SELECTOR, "img.mb-3.mx-auto.js-page")
+        imgs = driver.find_elements(By.CSS_SELECTOR, PAGE_SELECTOR)
 
         valid = [".jpg", ".jpeg", ".png", ".webp"]
         urls  = []
@@ -95,69 +104,92 @@ def try_download(ch_url: str) -> list[str]:
             if any(clean.endswith(ext) for ext in valid):
                 urls.append(src)
 
-        return urls
-    except Exception:
-        return []
+        # spooled into the chapter folder; download_chapter renames them into place
+        bodies = capture_image_bodies(driver, urls, chapter_dir) if len(urls) > 4 else {}
+
+    return urls, bodies
+
+def try_download(ch_url: str, chapter_dir: str) -> tuple[list[str], dict[str, str]]:
+    # the URL was already HEAD-checked by the mirror resolver
+    try:
+        return policy.call(_render_chapter, ch_url, chapter_dir, host=host_of(ch_url))
+    except Exception as exc:
+        print(f"  ⚠️ {ch_url}: {type(exc).__name__}: {exc}")
+        return [], {}
 
 # ── find already‑downloaded chapters ───────────────────────────────────────────
 os.makedirs(pic_root, exist_ok=True)
-existing = {
-    int(name.replace("chapter-", ""))
-    for name in os.listdir(pic_root)
-    if name.startswith("chapter-") and
-       os.path.isdir(os.path.join(pic_root, name))
-}
+library  = open_library(os.path.dirname(pic_root))
+if library.reconcile_if_stale(manga_name):
+    print("🔄  Storage totals reconciled")
+existing = library.chapter_numbers(manga_name)
 max_existing = max(existing) if existing else 0
 print(f"⏭️  Skipped {len(existing)} chapters (up to {max_existing})")
 
+# ── site gate: any mirror up, else defer to the next run ──────────────────────
+with SiteHealth(["readkingdom"]) as health:
+    site_up = health.wait_until_up("readkingdom")
+if not site_up:
+    print("⏸️  All readkingdom mirrors are down – deferring to the next run.")
+    pool.close()
+    downloader.close()
+    sys.exit(0)
+
+# ── newest chapter: HEAD-probe gallop, bounded by the manga page ──────────────
+# one HEAD on the primary mirror per probe; resolve() would race all of them
+latest = resolve_latest(manga_name, lambda n: url_exists(session, mirrors.primary_url(n)),
+                        max_existing, readkingdom_latest(manga_name, {}))
+print(f"🔭  Latest chapter online: {latest}")
+
 # ── main loop ──────────────────────────────────────────────────────────────────
 chapter = 1
 while True:
     while chapter in existing:
         chapter += 1
+    if chapter > latest:
+        print("🏁 Reached the latest chapter.")
+        break
 
     chapter_dir = os.path.join(pic_root, f"chapter-{chapter}")
     print(f"\n📚 Chapter {chapter}")
 
-    img_urls, final_url = [], None
-    dom_list = [working_dom] if working_dom else base_domains
+    img_urls, bodies, final_url = [], {}, None
+    tried = set()
 
-    for base in dom_list:
-        if base is None:
-            continue
-        for slug in (f"{chapter_slug}-{chapter:03d}",
-                     f"{chapter_slug}-{chapter}"):
-            url = f"{base}/chapter/{slug}/"
-            imgs = try_download(url)
+    for race in (False, True):
+        for url in mirrors.resolve(chapter, race=race):
+            if url in tried:
+                continue
+            tried.add(url)
+            imgs, captured = try_download(url, chapter_dir)
             if len(imgs) > 4:
-                img_urls, final_url = imgs, url
-                working_dom = base
+                img_urls, bodies, final_url = imgs, captured, url
+                mirrors.confirm(chapter, url)
                 break
-        if final_url:
+        if final_url or mirrors.last_raced:
             break
 
     if not final_url:
-        print("🚫 No valid images found. Likely last chapter.")
-        break
+        print("🚫 No valid images found.")
+        log_lines.append(f"[Chapter {chapter}] 🚫 no images on any mirror")
+        chapter += 1
+        continue
 
-    print(f"✅ Found {len(img_urls)} images. Downloading…")
-    os.makedirs(chapter_dir, exist_ok=True)
+    print(f"✅ Found {len(img_urls)} images ({len(bodies)} captured from the browser). Downloading…")
+    try:
+        total_bytes += downloader.download_chapter(img_urls, chapter_dir, prefetched=bodies)
+        print(f"  ✅ {len(img_urls)} images saved")
+    except ChapterDownloadError as exc:
+        print(f"  ❌ {exc}")
+        shutil.rmtree(chapter_dir, ignore_errors=True)
+        log_lines.append(f"[Chapter {chapter}] ❌ failed from {final_url}")
+        chapter += 1
+        continue
 
-    for idx, img_url in enumerate(img_urls, start=1):
-        ext  = img_url.split(".")[-1].split("?")[0]
-        name = f"{idx:03d}.{ext}"
-        path = os.path.join(chapter_dir, name)
-        try:
-            res = session.get(img_url, headers=headers, timeout=30)
-            total_bytes += len(res.content)
-            with open(path, "wb") as fh:
-                fh.write(res.content)
-            print(f"  ✅ {name}")
-        except Exception:
-            print(f"  ❌ {img_url}")
+    library.update_chapter(manga_name, chapter)
 
     run_gib  = round(total_bytes / 1024 / 1024 / 1024, 5)
-    total_gb = dir_size_gib(pic_root)
+    total_gb = round(library.series_bytes(manga_name) / 1024 / 1024 / 1024, 5)
     print(f"📦  Downloaded this run: {run_gib:.5f} GB")
     print(f"💾  Total stored:       {total_gb:.5f} GB")
 
@@ -172,8 +204,11 @@ with open(log_path, "w", encoding="utf-8") as fh:
     fh.write("\n".join(log_lines))
 
 # ── tidy up ────────────────────────────────────────────────────────────────────
-driver.quit()
-for proc in ["chrome", "chromedriver", "chromium", "HeadlessChrome", "selenium"]:
-    os.system(f"pkill -f {proc}")
+print(pool.report())
+print(readiness.report())
+print(mirrors.report())
+pool.close()
+downloader.close()
+supervisor.shutdown()
 
 print(f"\n✅ Finished in {time() - start_time:.2f} s")
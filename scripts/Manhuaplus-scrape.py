@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -11,31 +12,108 @@ from functions.Manhuaplus_scrape import (
     make_log_folder,
     CHECK_URL,
     wait_for_connection,
-    download_manhwa,
+    enqueue_manhwa,
+    run_chapter_job,
+    QUEUE_SOURCE,
+    BrowserPool,
+    start_harvest_browser,
 )
+from functions.common.image_downloader import ImageDownloader
+from functions.common.job_queue import JobQueue, run_workers
+from functions.common.sharding import ALL, parse_shard, run_sharded
+
+# per-worker state, created inside each worker process
+_worker: dict = {}
+
+
+def _setup() -> None:
+    _worker["downloader"] = ImageDownloader()
+    # only the a.readImg hrefs are read, so Chrome need not load the images
+    _worker["pool"]       = BrowserPool(factory=start_harvest_browser)
+
+
+def _teardown() -> None:
+    print(_worker["pool"].report())
+    _worker["pool"].close()
+    _worker["downloader"].close()
+
+
+def _run_series(manhwas: list[dict], log_folder: str, args, accept=None) -> None:
+    """Scan *manhwas* and drain their queued chapters (one shard's share)."""
+    if not args.no_scan:
+        queue = JobQueue()
+        for m in manhwas:
+            enqueue_manhwa(m, queue, log_folder)
+        queue.close()
+
+    def handle(job):
+        run_chapter_job(job, log_folder, _worker["downloader"], _worker["pool"])
+
+    # download_chapter already retries; a failed job waits for the next run
+    run_workers(QUEUE_SOURCE, handle, workers=args.workers, accept=accept,
+                setup=_setup, teardown=_teardown, max_attempts=1)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Download new ManhuaPlus chapters.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes pulling chapters from the queue")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="processes that each scan and download a fixed slice of the series")
+    parser.add_argument("--shard", type=parse_shard, default=ALL,
+                        help="K/N: only this host's slice, for hosts sharing the pictures directory")
+    parser.add_argument("--no-scan", action="store_true",
+                        help="only drain jobs left over from an earlier run")
+    parser.add_argument("--wait-for-site", type=float, default=120,
+                        help="seconds to wait for manhuaplus.org before deferring")
+    args = parser.parse_args()
+
     start = time()
 
     kill_zombie_chrome()
 
 
-    wait_for_connection(CHECK_URL)
+    if not wait_for_connection(CHECK_URL, args.wait_for_site):
+        return   # queued chapters stay queued for the next run
+
+    log_folder = make_log_folder()
+    queue      = JobQueue()
+
+    reclaimed = queue.reclaim()
+    if reclaimed:
+        print(f"♻️  Resuming {reclaimed} interrupted chapter(s)")
+    queue.close()   # workers and shards are forked below; each opens its own
+
+    manhwas = {m["name"]: m for m in load_manhwa_list() if args.shard.owns(m["name"])}
+    if args.shard != ALL:
+        print(f"🧩  Host shard {args.shard}: {len(manhwas)} series")
+
+    if args.shards > 1:
+        # one process per shard: its own scan, browser pool and downloader
+        args.workers = 1
+
+        def work(names, shard):
+            wanted = set(names)
+            _run_series([manhwas[n] for n in names], log_folder, args, accept=wanted.__contains__)
 
-    manhwa_list = load_manhwa_list()
-    log_folder  = make_log_folder()
+        for error in run_sharded(list(manhwas), work, args.shards):
+            print(f"❌  {error}")
+    else:
+        _run_series(list(manhwas.values()), log_folder, args,
+                    accept=None if args.shard == ALL else args.shard.owns)
+    kill_zombie_chrome()   # browsers of workers that died mid-chapter
 
-    all_errors: list[str] = []
-    for m in manhwa_list:
-        all_errors.extend(download_manhwa(m, log_folder))
+    queue    = JobQueue()
+    failures = [f for f in queue.failures(QUEUE_SOURCE, since=start) if args.shard.owns(f[0])]
+    print(f"📊  Queue: {queue.counts(QUEUE_SOURCE)}")
+    queue.close()
 
     dur = time() - start
-    print(f"\n⏱️  Finished in {dur:.2f} s")
-    if all_errors:
+    print(f"\n⏱️  Finished in {dur:.2f} s")
+    if failures:
         print("\n⚠️  Some chapters failed:")
-        for line in all_errors:
-            print("  •", line)
+        for name, chap, error in failures:
+            print("  •", f"{name} Chapter {chap}: {error}")
 
 
 if __name__ == "__main__":
@@ -1,25 +1,39 @@
 import os
 import re
+import sys
 import json
-import uuid
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from time import sleep, time
+from time import time
 from datetime import datetime
 import shutil
-
-os.system("pkill -f chrome")
-os.system("pkill -f chromedriver")
-os.system("pkill -f chromium")
-os.system("pkill -f HeadlessChrome")
-os.system("pkill -f selenium")
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.image_downloader import ImageDownloader
+from functions.common.chrome_profiles import profiles
+from functions.common.browser_supervisor import quit_chrome, start_chrome, supervisor
+from functions.Manhuaplus_scrape.browser_pool import BrowserPool
+from functions.common.library_index import open_library
+from functions.common.job_queue import JobQueue, JobSkipped, run_workers
+from functions.common.readiness import readiness
+from functions.common.network_capture import enable_capture, drain, capture_image_bodies
+from functions.common.url_harvest import enable_harvest
+from functions.common.latest_chapter import resolve_latest, url_exists
+from functions.common.retry import RetryPolicy, circuit_open, host_of
+from functions.common.site_health import GRACE, SiteHealth
+from functions.common.sharding import ALL, parse_shard, run_sharded, shard_log_path
+from functions.searchNewChapters.asura_helpers import extract_asura_latest_chapter
+
+# only browsers of crashed runs – other scrapers may be running right now
+supervisor.reap_orphans()
 
 SCRIPT_NAME   = "ManwhaScriptAsura"
+QUEUE_SOURCE  = "asura"
 LOG_FILENAME  = "new_chapters.log"
 
 json_path     = os.path.expanduser("~/server-backend/json/manhwa_list.json")
@@ -30,11 +44,10 @@ log_base      = os.path.join(base_dir, "logs")
 log_dir       = os.path.join(log_base, SCRIPT_NAME)
 os.makedirs(log_dir, exist_ok=True)
 
-profiles_root = os.path.join(log_dir, "chrome-profiles")
-os.makedirs(profiles_root, exist_ok=True)
+# per-uuid profiles used to live here; crashed runs left them behind
+shutil.rmtree(os.path.join(log_dir, "chrome-profiles"), ignore_errors=True)
 
 log_path      = os.path.join(log_dir, LOG_FILENAME)
-check_url     = "https://asuracomic.net"
 
 log_handle = open(log_path, "a", encoding="utf-8", buffering=1)
 
@@ -55,9 +68,8 @@ for name, sources in full_data.items():
             else:
                 print(f"⚠️  Missing or invalid URL for: {name}")
 
-def start_browser():
-    profile_dir = os.path.join(profiles_root, f"profile-{uuid.uuid4().hex}")
-    os.makedirs(profile_dir, exist_ok=False)
+def start_browser(harvest=False):
+    profile_dir = profiles.clone()
     chrome_options = Options()
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
@@ -65,60 +77,48 @@ def start_browser():
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--user-agent=Mozilla/5.0")
-    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
-    chrome_options.add_argument("--profile-directory=Default")
-    chrome_options.add_argument("--no-first-run")
-    chrome_options.add_argument("--no-default-browser-check")
-    chrome_options.add_argument("--password-store=basic")
-    chrome_options.add_argument("--use-mock-keychain")
+    for arg in profiles.chrome_args(profile_dir):
+        chrome_options.add_argument(arg)
     chrome_options.add_argument("--remote-debugging-port=0")
-    driver = webdriver.Chrome(options=chrome_options)
+    enable_capture(chrome_options)
+    try:
+        driver = start_chrome(chrome_options)
+    except Exception:
+        profiles.release(profile_dir)
+        raise
     driver._profile_dir = profile_dir
-    return driver
-
-def wait_for_connection():
-    while True:
-        try:
-            res = requests.get(check_url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-            if res.status_code == 200:
-                print("✅ Website is reachable.")
-                return
-        except Exception:
-            print("❌ Can't connect. Retrying in 5 min...")
-        sleep(300)
+    # the default keeps images on: the readiness check counts decoded pages
+    # and the captured bodies are saved directly
+    return enable_harvest(driver) if harvest else driver
 
-CHAP_RE = re.compile(r"/chapter/(\d+)(?:[/?#]|$)")
+def close_browser(driver):
+    quit_chrome(driver)
+    try:
+        if hasattr(driver, "_profile_dir"):
+            profiles.release(driver._profile_dir)
+    except Exception:
+        pass
 
-def get_latest_chapter(base_url: str) -> int:
+def get_latest_chapter(base_url: str, known: int = 0) -> int:
+    # gallop over /chapter/N with HEAD probes, bounded by the listing
     try:
-        res = requests.get(base_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-        nums = []
-        for a in soup.find_all("a", href=True):
-            m = CHAP_RE.search(a["href"])
-            if m:
-                try:
-                    nums.append(int(m.group(1)))
-                except ValueError:
-                    pass
-        return max(nums) if nums else 1
+        listed = extract_asura_latest_chapter(base_url)
     except Exception as e:
         print(f"❌ get_latest_chapter error: {e}")
-        return 1
-
-def _gentle_autoscroll(driver, steps=24, pause=0.2):
-    last_h = -1
-    for _ in range(steps):
-        driver.execute_script("window.scrollBy(0, Math.ceil(window.innerHeight*0.9));")
-        sleep(pause)
-        h = driver.execute_script("return Math.max(document.body.scrollTop, document.documentElement.scrollTop);")
-        if h == last_h:
-            break
-        last_h = h
+        listed = None
+    return resolve_latest(base_url.rsplit("/", 1)[-1],
+                          lambda n: url_exists(http, f"{base_url}/chapter/{n}"), known, listed)
+
+PAGE_SELECTOR = "img.object-cover.mx-auto[src], .object-cover.mx-auto img[src]"
+
+def _wait_for_pages(driver):
+    return readiness.wait(driver, "asura", PAGE_SELECTOR)
+
+UNAVAILABLE_OVERLAY = ".fixed.inset-0.flex.items-center.justify-center.z-50.rounded-md"
 
 def _chapter_unavailable(driver):
     try:
-        elems = driver.find_elements(By.CSS_SELECTOR, ".fixed.inset-0.flex.items-center.justify-center.z-50.rounded-md")
+        elems = driver.find_elements(By.CSS_SELECTOR, UNAVAILABLE_OVERLAY)
         return len(elems) > 0
     except Exception:
         return False
@@ -145,7 +145,6 @@ def _find_target_images(driver):
     return dedup
 
 def _collect_image_urls(driver):
-    _gentle_autoscroll(driver, steps=30, pause=0.2)
     img_elements = _find_target_images(driver)
     urls, seen = [], set()
     def add(u: str | None):
@@ -164,22 +163,94 @@ def _collect_image_urls(driver):
     return urls
 
 def _expected_image_count(driver):
-    _gentle_autoscroll(driver, steps=30, pause=0.2)
+    _wait_for_pages(driver)
     return len(_find_target_images(driver))
 
-def _download_images_to_folder(image_urls, dest_folder):
-    os.makedirs(dest_folder, exist_ok=True)
-    for i, src in enumerate(image_urls, start=1):
-        base = src.split("?")[0].split("#")[0]
-        ext = base.split(".")[-1].lower() if "." in base else "jpg"
-        if ext not in ("webp", "jpg", "jpeg", "png", "gif"):
-            ext = "jpg"
-        file_name = f"{i:03d}.{ext}"
-        img_resp = requests.get(src, headers={"User-Agent": "Mozilla/5.0"}, timeout=20)
-        img_resp.raise_for_status()
-        with open(os.path.join(dest_folder, file_name), "wb") as f:
-            f.write(img_resp.content)
-        sleep(0.15)
+# created per worker process in _worker_setup
+downloader = None
+pool       = None
+
+def _download_images_to_folder(image_urls, dest_folder, prefetched=None):
+    downloader.download_chapter(image_urls, dest_folder, prefetched=prefetched)
+
+# ── embedded page payload (no browser) ─────────────────────────────────────────
+# Chapter pages are server-rendered by Next.js: the ordered page list travels
+# in the inline ``self.__next_f.push([1,"…"])`` flight chunks as
+# ``"pages":[{"order":1,"url":"https://…/01.webp"}, …]``.
+NEXT_PUSH_RE  = re.compile(r'self\.__next_f\.push\(\[1,"((?:[^"\\]|\\.)*)"\]\)')
+PAGES_RE      = re.compile(r'"pages":(\[[^\]]*\])')
+PAGE_ENTRY_RE = re.compile(r'"order":(\d+),"url":"(https?://[^"]+)"')
+CLASS_RE      = re.compile(r'class(?:Name)?"?[=:]"([^"]*)"')
+LOCKED_RE     = re.compile(r'"(?:is_?[Ll]ocked|locked|is_?[Pp]remium)":true')
+
+def _payload_gated(html, flight):
+    """Does the page carry the unavailable overlay or a lock flag?
+
+    Locked chapters still list their preview pages, so those must never be
+    saved as the chapter; the browser path makes the final call.
+    """
+    if LOCKED_RE.search(flight):
+        return True
+    overlay = set(UNAVAILABLE_OVERLAY.strip(".").split("."))
+    return any(overlay <= set(m.group(1).split())
+               for text in (html, flight) for m in CLASS_RE.finditer(text))
+
+def _new_session():
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+http = _new_session()
+
+def _payload_image_urls(chap_url):
+    res = http.get(chap_url, timeout=20)
+    res.raise_for_status()
+
+    flight = []
+    for m in NEXT_PUSH_RE.finditer(res.text):
+        try:
+            flight.append(json.loads(f'"{m.group(1)}"'))
+        except ValueError:
+            continue
+    flight = "".join(flight)
+    if _payload_gated(res.text, flight):
+        print("🔒 Payload looks locked/unavailable – checking in the browser")
+        return []
+
+    pages = {}
+    for m in PAGES_RE.finditer(flight):
+        try:
+            entries = json.loads(m.group(1))
+        except ValueError:
+            continue
+        for e in entries:
+            if isinstance(e, dict) and "url" in e and "order" in e:
+                pages.setdefault(int(e["order"]), e["url"])
+    if not pages:
+        for m in PAGE_ENTRY_RE.finditer(flight):
+            pages.setdefault(int(m.group(1)), m.group(2))
+
+    urls = []
+    for _, u in sorted(pages.items()):
+        base = u.split("?")[0].split("#")[0]
+        ext = base.split(".")[-1].lower() if "." in base else ""
+        if ext in ("webp", "jpg", "jpeg", "png", "gif") and u not in urls:
+            urls.append(u)
+    return urls
+
+def _download_via_payload(chap_url, temp_folder):
+    """Return ``(expected, got)`` or ``None`` when the browser should take over."""
+    try:
+        urls = RetryPolicy(attempts=2).call(_payload_image_urls, chap_url, host=host_of(chap_url))
+        if len(urls) <= 1:
+            return None
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        _download_images_to_folder(urls, temp_folder)
+        return len(urls), _count_downloaded_images(temp_folder)
+    except Exception as e:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        print(f"⚠️ Payload download failed, falling back to browser: {e}")
+        return None
 
 def _count_downloaded_images(folder):
     if not os.path.isdir(folder):
@@ -196,118 +267,184 @@ class SingleImageDetected(Exception):
 class ChapterUnavailable(Exception):
     pass
 
-def _download_with_verification(driver, chap_url, temp_folder, max_attempts=5):
-    attempt = 1
-    while attempt <= max_attempts:
-        try:
-            driver.get(chap_url)
-        except Exception:
-            sleep(2)
-            driver.get(chap_url)
-        try:
-            if _chapter_unavailable(driver):
-                raise ChapterUnavailable("Chapter unavailable overlay detected")
-            shutil.rmtree(temp_folder, ignore_errors=True)
-            expected = _expected_image_count(driver)
-            if expected <= 1:
-                raise SingleImageDetected(f"Only {expected} image(s) on page")
-            urls = _collect_image_urls(driver)
-            os.makedirs(temp_folder, exist_ok=True)
-            _download_images_to_folder(urls, temp_folder)
-            got = _count_downloaded_images(temp_folder)
-            if got <= 1:
-                raise SingleImageDetected(f"Only {got} image(s) downloaded")
-            if got == expected and expected > 0:
-                return True, expected, got
-            attempt += 1
-            shutil.rmtree(temp_folder, ignore_errors=True)
-            sleep(1.0 + attempt * 0.5)
-            driver.refresh()
-            _gentle_autoscroll(driver, steps=35, pause=0.2)
-        except ChapterUnavailable:
-            shutil.rmtree(temp_folder, ignore_errors=True)
-            raise
-        except SingleImageDetected:
-            shutil.rmtree(temp_folder, ignore_errors=True)
-            raise
-        except Exception:
-            attempt += 1
-            shutil.rmtree(temp_folder, ignore_errors=True)
-            sleep(1.0 + attempt * 0.5)
-            try:
-                driver.refresh()
-            except Exception:
-                pass
-            _gentle_autoscroll(driver, steps=35, pause=0.2)
-    return False, 0, 0
-
-start_time = time()
-wait_for_connection()
+class IncompleteChapter(Exception):
+    pass
 
-for manhwa in manhwa_list:
-    name      = manhwa["name"]
-    base_url  = manhwa["url"]
-    url_format = f"{base_url}/chapter/{{}}"
+def _verified_attempt(driver, chap_url, temp_folder):
+    shutil.rmtree(temp_folder, ignore_errors=True)
+    drain(driver)
+    driver.get(chap_url)
+    if _chapter_unavailable(driver):
+        raise ChapterUnavailable("Chapter unavailable overlay detected")
+    expected = _expected_image_count(driver)
+    if expected <= 1:
+        raise SingleImageDetected(f"Only {expected} image(s) on page")
+    urls = _collect_image_urls(driver)
+    os.makedirs(temp_folder, exist_ok=True)
+    # pages Chrome already holds are written directly, the rest over HTTP
+    _download_images_to_folder(urls, temp_folder, capture_image_bodies(driver, urls, temp_folder))
+    got = _count_downloaded_images(temp_folder)
+    if got <= 1:
+        raise SingleImageDetected(f"Only {got} image(s) downloaded")
+    if got != expected:
+        raise IncompleteChapter(f"{got}/{expected} images")
+    return True, expected, got
 
+def _download_with_verification(driver, chap_url, temp_folder, max_attempts=5):
+    policy = RetryPolicy(attempts=max_attempts, fatal=(ChapterUnavailable, SingleImageDetected))
+    try:
+        return policy.call(_verified_attempt, driver, chap_url, temp_folder,
+                           host=host_of(chap_url))
+    except (ChapterUnavailable, SingleImageDetected):
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        raise
+    except Exception as exc:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        if circuit_open(exc):
+            raise   # the queue defers the chapter until the host may be retried
+        return False, 0, 0
+
+def process_chapter(job):
+    name        = job.series
+    chap        = job.chapter
     folder_path = os.path.join(pictures_base, name)
-    os.makedirs(folder_path, exist_ok=True)
-
-    print(f"\n📚 Processing manhwa: {name}")
-    last_chapter = get_latest_chapter(base_url)
+    chap_folder = os.path.join(folder_path, f"chapter-{chap}")
+    temp_folder = os.path.join(folder_path, f"chapter-{chap}_temp")
+    chap_url    = f"{job.payload['url']}/chapter/{chap}"
 
-    driver = None
     try:
-        driver = start_browser()
-        driver.set_page_load_timeout(60)
-        driver.set_script_timeout(30)
+        fast = _download_via_payload(chap_url, temp_folder)
+        if fast and fast[0] == fast[1]:
+            expected, got = fast
+        else:
+            with pool.lease() as driver:
+                ok, expected, got = _download_with_verification(driver, chap_url, temp_folder, max_attempts=5)
+        with open(os.path.join(temp_folder, "source.txt"), "w") as f:
+            f.write("Downloaded from AsuraScans")
+        if job.payload.get("replace"):
+            shutil.rmtree(chap_folder, ignore_errors=True)
+        os.rename(temp_folder, chap_folder)
+        log(f"✅ Downloaded {name} chapter {chap} ({got}/{expected} images)")
+    except ChapterUnavailable:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        log(f"⏭️ {name} chapter {chap} – chapter unavailable, skipped")
+        raise JobSkipped("chapter unavailable")
+    except SingleImageDetected as si:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        log(f"ℹ️ {name} chapter {chap} – single image detected; treating as no new chapter")
+        raise JobSkipped(str(si))
+    except Exception as e:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        if (opened := circuit_open(e)) is not None:
+            log(f"⏸️ {name} chapter {chap} – {opened}; deferred")
+        else:
+            log(f"❌ {name} chapter {chap} – {e}")
+        raise
+    finally:
+        open_library(pictures_base).update_chapter(name, chap)
+
+def _worker_setup():
+    # each worker process gets its own browsers, download threads and session
+    global pool, downloader, http
+    http       = _new_session()
+    downloader = ImageDownloader()
+    pool       = BrowserPool(factory=start_browser, dispose=close_browser)
+
+def _worker_teardown():
+    print(pool.report())
+    print(readiness.report())
+    readiness.save()
+    pool.close()
+    downloader.close()
+
+def enqueue_series(manhwas, queue):
+    library = open_library(pictures_base)
+    for manhwa in manhwas:
+        name      = manhwa["name"]
+        base_url  = manhwa["url"]
+
+        folder_path = os.path.join(pictures_base, name)
+        os.makedirs(folder_path, exist_ok=True)
+
+        print(f"\n📚 Processing manhwa: {name}")
+        local = {c.number: c for c in library.chapters(name)}
+        known = max((n for n, c in local.items()
+                     if not c.source or c.source == "Downloaded from AsuraScans"), default=0)
+        last_chapter = get_latest_chapter(base_url, known)
 
         for chap in range(1, last_chapter + 1):
-            chap_folder  = os.path.join(folder_path, f"chapter-{chap}")
-            temp_folder  = os.path.join(folder_path, f"chapter-{chap}_temp")
-            chap_url     = url_format.format(chap)
             needs_replacement = False
 
-            if os.path.exists(chap_folder):
-                src_file = os.path.join(chap_folder, "source.txt")
-                if os.path.exists(src_file):
-                    with open(src_file) as f:
-                        if f.read().strip() == "Downloaded from AsuraScans":
-                            continue
-                        else:
-                            needs_replacement = True
-                else:
+            if chap in local:
+                if not local[chap].source or local[chap].source == "Downloaded from AsuraScans":
                     continue
+                needs_replacement = True
+
+            queue.enqueue(name, QUEUE_SOURCE, chap, {"url": base_url, "replace": needs_replacement})
+
+def run_shard(names, shard):
+    # a forked shard: own log file, session, scan and queue workers
+    global log_handle, http
+    log_handle = open(shard_log_path(log_path, shard), "w", encoding="utf-8", buffering=1)
+    http = _new_session()
+    wanted = set(names)
+    shard_queue = JobQueue()
+    if not args.no_scan:
+        enqueue_series([m for m in manhwa_list if m["name"] in wanted], shard_queue)
+    shard_queue.close()
+    run_workers(QUEUE_SOURCE, process_chapter, accept=wanted.__contains__,
+                setup=_worker_setup, teardown=_worker_teardown, max_attempts=1)
+    log_handle.close()
+
+parser = argparse.ArgumentParser(description="Download new AsuraScans chapters.")
+parser.add_argument("--workers", type=int, default=1,
+                    help="worker processes pulling chapters from the queue")
+parser.add_argument("--shards", type=int, default=1,
+                    help="processes that each scan and download a fixed slice of the series")
+parser.add_argument("--shard", type=parse_shard, default=ALL,
+                    help="K/N: only this host's slice, for hosts sharing the pictures directory")
+parser.add_argument("--no-scan", action="store_true",
+                    help="only drain jobs left over from an earlier run")
+parser.add_argument("--wait-for-site", type=float, default=GRACE,
+                    help="seconds to wait for asuracomic.net before deferring")
+args = parser.parse_args()
 
-            try:
-                ok, expected, got = _download_with_verification(driver, chap_url, temp_folder, max_attempts=5)
-                with open(os.path.join(temp_folder, "source.txt"), "w") as f:
-                    f.write("Downloaded from AsuraScans")
-                if needs_replacement:
-                    shutil.rmtree(chap_folder, ignore_errors=True)
-                os.rename(temp_folder, chap_folder)
-                log(f"✅ Downloaded {name} chapter {chap} ({got}/{expected} images)")
-            except ChapterUnavailable:
-                shutil.rmtree(temp_folder, ignore_errors=True)
-                log(f"⏭️ {name} chapter {chap} – chapter unavailable, skipped")
-            except SingleImageDetected as si:
-                shutil.rmtree(temp_folder, ignore_errors=True)
-                log(f"ℹ️ {name} chapter {chap} – single image detected; treating as no new chapter")
-            except Exception as e:
-                shutil.rmtree(temp_folder, ignore_errors=True)
-                log(f"❌ {name} chapter {chap} – {e}")
-
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
-            try:
-                if hasattr(driver, "_profile_dir"):
-                    sleep(0.5)
-                    shutil.rmtree(driver._profile_dir, ignore_errors=True)
-            except Exception:
-                pass
-
+start_time = time()
+with SiteHealth(["asura"]) as health:
+    if not health.wait_until_up("asura", args.wait_for_site):
+        log("⏸️ asura is down – leaving queued chapters for the next run")
+        log_handle.close()
+        sys.exit(0)
+
+manhwa_list = [m for m in manhwa_list if args.shard.owns(m["name"])]
+if args.shard != ALL:
+    log(f"🧩 Host shard {args.shard}: {len(manhwa_list)} series")
+
+queue = JobQueue()
+
+reclaimed = queue.reclaim()
+if reclaimed:
+    log(f"♻️ Resuming {reclaimed} interrupted chapter(s)")
+
+if args.shards > 1:
+    queue.close()   # each shard opens its own after the fork
+    # shard logs are appended to new_chapters.log once every shard is done
+    for error in run_sharded([m["name"] for m in manhwa_list], run_shard, args.shards,
+                             log_path=log_path):
+        log(f"❌ {error}")
+else:
+    if not args.no_scan:
+        enqueue_series(manhwa_list, queue)
+    queue.close()   # never carry a SQLite connection across fork
+
+    # _download_with_verification retries itself; failed jobs wait for the next run
+    run_workers(QUEUE_SOURCE, process_chapter, workers=args.workers,
+                accept=None if args.shard == ALL else args.shard.owns,
+                setup=_worker_setup, teardown=_worker_teardown, max_attempts=1)
+supervisor.reap_orphans()   # browsers of workers that died mid-chapter
+
+queue = JobQueue()
+print(f"📊 Queue: {queue.counts(QUEUE_SOURCE)}")
+queue.close()
 log_handle.close()
 print(f"\n⏱️ Finished in {time() - start_time:.2f} sec")
@@ -1,23 +1,35 @@
 import os
+import sys
 import json
+import fcntl
+import shutil
+import argparse
 import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from time import sleep
+from time import time
 
-# Kill zombie Chrome processes
-os.system("pkill -f chrome")
-os.system("pkill -f chromedriver")
-os.system("pkill -f chromium")
-os.system("pkill -f HeadlessChrome")
-os.system("pkill -f selenium")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.image_downloader import ImageDownloader, ChapterDownloadError
+from functions.Manhuaplus_scrape.browser_pool import BrowserPool
+from functions.common.library_index import open_library
+from functions.common.readiness import readiness
+from functions.common.url_harvest import enable_harvest
+from functions.common.retry import RETRYABLE_STATUS, RetryPolicy, host_of
+from functions.common.site_health import GRACE as SITE_GRACE, SiteHealth
+from functions.common.browser_supervisor import start_chrome, supervisor
+from functions.common.sharding import ALL, parse_shard, run_sharded
+
+# only browsers of crashed runs – other scrapers may be running right now
+supervisor.reap_orphans()
 
 # === PATHS ===
 base_dir = os.path.expanduser("~/backend")
 pictures_base = os.path.join(base_dir, "pictures")
 json_path = os.path.expanduser("~/server-backend/json/manhwa_list.json")
+path_flags_file = os.path.join(base_dir, "data", "ManwhaScriptOther_paths.json")
 
 # === CHROME SETUP ===
 chrome_options = Options()
@@ -28,152 +40,271 @@ chrome_options.add_argument("--no-sandbox")
 chrome_options.add_argument("--disable-dev-shm-usage")
 chrome_options.add_argument('--user-agent=Mozilla/5.0')
 
-def start_browser():
-    return webdriver.Chrome(options=chrome_options)
+def start_browser(harvest=True):
+    # the browser path only reads image URLs, so images/fonts/ads are blocked
+    driver = start_chrome(chrome_options)
+    return enable_harvest(driver) if harvest else driver
 
 # === JSON LOAD ===
 with open(json_path, "r", encoding="utf-8") as f:
     manhwa_data = json.load(f)
 
 # === SITE SETTINGS ===
+# All four are Madara/WordPress themes that ship the page list in the initial
+# HTML, so the plain HTTP path is tried first and the browser is the fallback.
+# "deadline" caps how long the browser path waits for the page images.
 SITE_CONFIG = {
     "yaksha": {
         "url": "https://yakshascans.com/manga/{slug}/chapter-{chapter}/",
         "selector": "div.page-break.no-gaps img",
         "attr": "src",
-        "sleep": 8
+        "deadline": 8
     },
     "manhwaclan": {
         "url": "https://manhwaclan.com/manga/{slug}/chapter-{chapter}/",
         "selector": "div.page-break.no-gaps img",
         "attr": "src",
-        "sleep": 5
+        "deadline": 5
     },
     "manhuaus": {
         "url": "https://manhuaus.com/manga/{slug}/chapter-{chapter}",
         "selector": "div.page-break.no-gaps img",
         "attr": "data-src",
-        "sleep": 5
+        "deadline": 5
     },
     "kunmanga": {
-        "custom": True
+        "url": "https://kunmanga.com/manga/{slug}/chapter-{chapter}/",
+        "selector": "div.reading-content div.page-break img",
+        "attr": "src",
+        "deadline": 2,
+        "label": "KunManga"
     }
 }
 
-# === FUNCTIONS ===
-def download_kunmanga_chapter(slug, chapter_num, local_path):
+# real URL of a lazy-loaded page; "src" is only the placeholder until JS swaps it
+LAZY_ATTRS = ("data-src", "data-lazy-src", "data-cfsrc")
+PATH_FLAG_MAX_AGE = 24 * 60 * 60   # re-probe the other path once a day
+
+# === PATH FLAGS (which extraction path worked per site) ===
+def load_path_flags():
     try:
-        url = f"https://kunmanga.com/manga/{slug}/chapter-{chapter_num}/"
-        chapter_dir = os.path.join(local_path, f"chapter-{chapter_num}")
-        print(f"\n🔎 Checking kunmanga: {slug} Chapter {chapter_num}")
+        with open(path_flags_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-        driver.get(url)
-        sleep(2)
+def save_path_flag(site):
+    # shards write this concurrently: re-read under a lock and merge in only
+    # this site's flag, so no shard overwrites another's updates
+    os.makedirs(os.path.dirname(path_flags_file), exist_ok=True)
+    with open(f"{path_flags_file}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = load_path_flags()
+        merged[site] = path_flags[site]
+        tmp = f"{path_flags_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2)
+        os.replace(tmp, path_flags_file)
+    for other, flag in merged.items():
+        if other != site:
+            path_flags[other] = flag   # pick up what the other shards learned
+
+def set_path_flag(site, path):
+    if path_flags.get(site, {}).get("path") != path:
+        print(f"🚩 {site}: using {path} path")
+    path_flags[site] = {"path": path, "at": time()}
+    save_path_flag(site)
+
+# === FUNCTIONS ===
+def _img_url(get, config):
+    # get: Tag.get for parsed HTML, WebElement.get_attribute in the browser
+    for attr in LAZY_ATTRS + (config["attr"], "src"):
+        val = (get(attr) or "").strip()
+        if val and not val.startswith("data:"):
+            return val
+    return None
+
+def _unique_urls(imgs, config, get):
+    urls = []
+    for img in imgs:
+        u = _img_url(get(img), config)
+        if u and u not in urls:
+            urls.append(u)
+    return urls
+
+def _get_page(url):
+    res = http.get(url, timeout=15)
+    if res.status_code in RETRYABLE_STATUS:
+        res.raise_for_status()   # 5xx / 429 → retried, then the breaker counts it
+    return res
+
+def image_urls_http(config, url):
+    res = policy.call(_get_page, url, host=host_of(url))
+    if res.status_code != 200:
+        return []
+    soup = BeautifulSoup(res.text, "html.parser")
+    return _unique_urls(soup.select(config["selector"]), config, lambda img: img.get)
 
-        imgs = driver.find_elements(By.CSS_SELECTOR, "div.reading-content div.page-break img")
-        img_urls = [img.get_attribute("src") for img in imgs if img.get_attribute("src")]
+def image_urls_browser(site, config, url):
+    return policy.call(_browser_image_urls, site, config, url, host=host_of(url))
 
-        if len(img_urls) <= 1:
-            print(f"✅ No real chapter content for {slug} chapter {chapter_num}")
-            return False
+def _browser_image_urls(site, config, url):
+    with pool.lease() as driver:
+        driver.get(url)
+        readiness.wait(driver, site, config["selector"], deadline=config["deadline"])
 
-        os.makedirs(chapter_dir, exist_ok=True)
-        for i, img_url in enumerate(img_urls):
-            ext = img_url.split('.')[-1].split('?')[0]
-            name = f"{i+1:03d}.{ext}"
-            path = os.path.join(chapter_dir, name)
-            res = session.get(img_url, headers=headers, timeout=30)
-            with open(path, "wb") as f:
-                f.write(res.content)
-            print(f"✅ Saved {name}")
+        imgs = driver.find_elements(By.CSS_SELECTOR, config["selector"])
+        return _unique_urls(imgs, config, lambda img: img.get_attribute)
 
-        with open(os.path.join(chapter_dir, "source.txt"), "w") as f:
-            f.write("Downloaded from KunManga")
+def find_chapter_images(site, config, url):
+    # Both flags age out, so a site that starts (or stops) rendering its pages
+    # with JS is noticed within PATH_FLAG_MAX_AGE instead of never.
+    flag = path_flags.get(site, {})
+    fresh = time() - flag.get("at", 0) < PATH_FLAG_MAX_AGE
 
-        return True
+    if not (fresh and flag.get("path") == "browser"):
+        img_urls = image_urls_http(config, url)
+        if len(img_urls) > 1:
+            set_path_flag(site, "http")
+            return img_urls
+        if fresh and flag.get("path") == "http":
+            # the fast path worked here recently – nothing means no chapter
+            return img_urls
 
-    except Exception as e:
-        print(f"❌ Error checking kunmanga for {slug}: {e}")
-        return False
+    img_urls = image_urls_browser(site, config, url)
+    if len(img_urls) > 1:
+        set_path_flag(site, "browser")
+    elif flag.get("path") == "http":
+        # the browser found nothing either – HTTP is still right, check again tomorrow
+        set_path_flag(site, "http")
+    return img_urls
 
 # === MAIN ===
-session = requests.Session()
-headers = {"User-Agent": "Mozilla/5.0"}
-driver = start_browser()
+path_flags = load_path_flags()
+policy = RetryPolicy(attempts=3)
 
-# === DOWNLOAD LOGIC ===
-for slug, sources in manhwa_data.items():
-    supported_sources = [s for s in sources if s.get("site") in SITE_CONFIG]
-    if not supported_sources:
-        continue
+def open_resources():
+    # called once per process – a shard never shares browsers or sockets
+    global downloader, pool, library, http, health
+    downloader = ImageDownloader()
+    pool = BrowserPool(factory=start_browser)
+    library = open_library(pictures_base)
+    http = requests.Session()
+    http.headers.update({"User-Agent": "Mozilla/5.0"})
+    health = SiteHealth(sorted(SITE_CONFIG)).start()   # probes in the background from here on
 
-    local_path = os.path.join(pictures_base, slug)
-    if not os.path.exists(local_path):
-        print(f"⚠️ Folder missing for {slug}")
-        continue
+def close_resources():
+    health.stop()
+    print(pool.report())
+    print(readiness.report())
+    readiness.save()
+    pool.close()
+    downloader.close()
 
-    local_chapters = [
-        int(f.split("-")[-1]) for f in os.listdir(local_path)
-        if f.startswith("chapter-") and f.split("-")[-1].isdigit()
-    ]
-    last_local_chapter = max(local_chapters) if local_chapters else 0
+# === DOWNLOAD LOGIC ===
+def process_series(slug, sources, errors):
+    local_path = os.path.join(pictures_base, slug)
+    last_local_chapter = library.latest_chapter(slug) or 0
 
     print(f"\n📘 Now processing: {slug}")
     new_chapter = last_local_chapter + 1
 
     while True:
         downloaded = False
-        for source in supported_sources:
+        for source in sources:
             site = source["site"]
             site_slug = source.get("name", slug)
             config = SITE_CONFIG[site]
 
-            print(f"\n🔎 Trying {site}: {site_slug} Chapter {new_chapter}")
-
-            if config.get("custom"):
-                success = download_kunmanga_chapter(site_slug, new_chapter, local_path)
-                if success:
-                    downloaded = True
-                    break
+            if not health.is_up(site):
+                print(f"⏸️ {site} is down – skipping it for {site_slug}")
                 continue
 
+            print(f"\n🔎 Trying {site}: {site_slug} Chapter {new_chapter}")
+
             try:
                 url = config["url"].format(slug=site_slug, chapter=new_chapter)
-                driver.get(url)
-                sleep(config["sleep"])
-
-                imgs = driver.find_elements(By.CSS_SELECTOR, config["selector"])
-                img_urls = [img.get_attribute(config["attr"]) for img in imgs if img.get_attribute(config["attr"])]
+                img_urls = find_chapter_images(site, config, url)
 
                 if len(img_urls) <= 1:
                     print(f"✅ No real chapter content for {site_slug} chapter {new_chapter}")
                     continue
 
                 chapter_dir = os.path.join(local_path, f"chapter-{new_chapter}")
-                os.makedirs(chapter_dir, exist_ok=True)
-                for i, img_url in enumerate(img_urls):
-                    ext = img_url.split('.')[-1].split('?')[0]
-                    name = f"{i+1:03d}.{ext}"
-                    path = os.path.join(chapter_dir, name)
-                    res = session.get(img_url, headers=headers, timeout=30)
-                    with open(path, "wb") as f:
-                        f.write(res.content)
-                    print(f"✅ Saved {name}")
+                try:
+                    downloader.download_chapter(img_urls, chapter_dir)
+                except ChapterDownloadError:
+                    shutil.rmtree(chapter_dir, ignore_errors=True)
+                    raise
+                print(f"✅ Saved {len(img_urls)} images")
 
                 with open(os.path.join(chapter_dir, "source.txt"), "w") as f:
-                    f.write(f"Downloaded from {site}")
+                    f.write(f"Downloaded from {config.get('label', site)}")
 
                 downloaded = True
                 break
 
             except Exception as e:
                 print(f"❌ Error checking {site} for {site_slug}: {e}")
+                errors.append(f"{slug} Chapter {new_chapter} ({site}): {e}")
                 continue
 
+        library.update_chapter(slug, new_chapter)
         if not downloaded:
             print(f"⚠️ Chapter {new_chapter} not found on any source for {slug}")
             break 
         else:
             new_chapter += 1
 
-driver.quit()
+def run_series(slugs, _shard=None):
+    open_resources()
+    errors = []
+    deferred = []
+    for slug in slugs:
+        sources = manhwa_data[slug]
+        supported_sources = [s for s in sources if s.get("site") in SITE_CONFIG]
+        if not supported_sources:
+            continue
+
+        local_path = os.path.join(pictures_base, slug)
+        if not os.path.exists(local_path):
+            print(f"⚠️ Folder missing for {slug}")
+            continue
+
+        if not any(health.is_up(s["site"]) for s in supported_sources):
+            print(f"⏸️ {slug}: every source is down – deferring")
+            deferred.append((slug, supported_sources))
+            continue
+
+        process_series(slug, supported_sources, errors)
+
+    # === DEFERRED (sites that were down) ===
+    # one shared grace period, however many series are waiting
+    grace_ends = time() + SITE_GRACE
+    for slug, supported_sources in deferred:
+        sites = [s["site"] for s in supported_sources]
+        if health.wait_any_up(sites, timeout=max(0, grace_ends - time())):
+            process_series(slug, supported_sources, errors)
+        else:
+            print(f"⏸️ {slug}: {', '.join(sites)} still down – left for the next run")
+
+    close_resources()
+    return errors
+
+parser = argparse.ArgumentParser(description="Download new chapters from the Madara sites.")
+parser.add_argument("--shards", type=int, default=1,
+                    help="processes that each handle a fixed slice of the series")
+parser.add_argument("--shard", type=parse_shard, default=ALL,
+                    help="K/N: only this host's slice, for hosts sharing the pictures directory")
+args = parser.parse_args()
+
+slugs = [slug for slug in manhwa_data if args.shard.owns(slug)]
+if args.shard != ALL:
+    print(f"🧩 Host shard {args.shard}: {len(slugs)} series")
+
+errors = run_sharded(slugs, run_series, args.shards)
+supervisor.reap_orphans()   # browsers of shards that died mid-chapter
+if errors:
+    print("\n⚠️ Some chapters failed:")
+    for error in errors:
+        print("  •", error)
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.tall_images import iter_slices
+
+# Peak RSS of slicing one tall strip into 16383 px .webp parts:
+#   legacy  – Image.open().convert("RGB") then crop (convert_to_webp before)
+#   banded  – functions.common.tall_images.iter_slices
+# Every measurement runs in a fresh interpreter and reads its own VmHWM
+# (ru_maxrss would carry over the parent's peak across fork + exec).
+
+MAX_HEIGHT = 16383
+
+def legacy_slices(path, slice_height):
+    img = Image.open(path).convert("RGB")
+    width, height = img.size
+    for top in range(0, height, slice_height):
+        yield img.crop((0, top, width, min(top + slice_height, height)))
+
+IMPLEMENTATIONS = {"legacy": legacy_slices, "banded": iter_slices}
+
+# === Synthetic strips ===
+def make_strip(path, width, height, mode):
+    # noise over gradients: compresses like a real page, not like a flat colour
+    tile_h = 1000
+    tile = Image.merge("RGB", [
+        Image.effect_noise((width, tile_h), 40),
+        Image.linear_gradient("L").resize((width, tile_h)),
+        Image.linear_gradient("L").rotate(90).resize((width, tile_h)),
+    ])
+    strip = Image.new("RGB", (width, height))
+    for top in range(0, height, tile_h):
+        strip.paste(tile, (0, top))
+    if mode != "RGB":
+        strip = strip.convert(mode)
+    strip.save(path)
+
+# === Child side ===
+def peak_rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+def run_one(impl, path, out_dir):
+    # baseline: interpreter + Pillow, before anything is decoded
+    base = peak_rss_kib()
+    start = time.time()
+    parts = 0
+    for part in IMPLEMENTATIONS[impl](path, MAX_HEIGHT):
+        part.save(os.path.join(out_dir, f"{parts:02}.webp"), "webp")
+        parts += 1
+        del part
+    peak = peak_rss_kib()
+    print(f"{parts} {base} {peak} {time.time() - start:.2f}")
+
+# === Parent side ===
+def measure(impl, path):
+    out_dir = tempfile.mkdtemp(prefix="bench-out-")
+    try:
+        res = subprocess.run(
+            [sys.executable, __file__, "--child", impl, path, out_dir],
+            capture_output=True, text=True, check=True,
+        )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    parts, base, peak, secs = res.stdout.split()
+    return int(parts), int(base) / 1024, int(peak) / 1024, float(secs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory of tall-image slicing.")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=50_000)
+    parser.add_argument("--formats", nargs="+", default=["png", "jpg", "png:P"],
+                        help="extension[:mode] of the synthetic strips")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--child", nargs=3, metavar=("IMPL", "PATH", "OUT"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(*args.child)
+        return
+
+    work = tempfile.mkdtemp(prefix="bench-strips-")
+    try:
+        print(f"📐 {args.width} x {args.height} px strips, {MAX_HEIGHT} px slices\n")
+        print(f"{'input':<10} {'impl':<8} {'parts':>5} {'peak MiB':>9} {'+decode':>9} {'secs':>6}")
+        for spec in args.formats:
+            ext, _, mode = spec.partition(":")
+            path = os.path.join(work, f"strip.{ext}")
+            make_strip(path, args.width, args.height, mode or "RGB")
+            for impl in IMPLEMENTATIONS:
+                runs = [measure(impl, path) for _ in range(args.repeat)]
+                parts, base, peak, secs = min(runs, key=lambda r: r[2])
+                print(f"{spec:<10} {impl:<8} {parts:>5} {peak:>9.1f} {peak - base:>9.1f} {secs:>6.2f}")
+            os.remove(path)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,32 @@ import os
 import sys
 import time
 import json
+import shutil
+import argparse
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from PIL import Image, UnidentifiedImageError
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.library_index import open_library
+from functions.common.tall_images import iter_slices
+from functions.common.job_queue import pid_alive
+
 MAX_HEIGHT = 16383
 ROOT = Path("/home/ubuntu/backend/pictures")
 LOG_DIR = Path("/home/ubuntu/backend/logs/convertToWebLog")
-TEMP_DIR = Path("/home/ubuntu/backend/temp")
+# one staging folder + journal per chapter in flight; same disk as ROOT so
+# every move is a rename
+STAGING_DIR = Path("/home/ubuntu/backend/convert-staging")
+REJECTED_DIR = Path("/home/ubuntu/backend/convert-rejected")   # undecodable originals
+MARK = "webp"
 MANHWA_LIST_JSON = Path("/home/ubuntu/server-backend/json/manhwa_list.json")
 
 LOG_DIR.mkdir(parents=True, exist_ok=True)
-TEMP_DIR.mkdir(parents=True, exist_ok=True)
+STAGING_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / f"log_{time.strftime('%-m-%-d-%Y-%H-%M')}.log"
 
 def log(msg):
@@ -27,91 +42,296 @@ def get_image_files(chapter_path):
         if f.suffix.lower() in [".jpg", ".jpeg", ".png", ".webp"]
     ], key=lambda f: f.name)
 
-def move_to_temp(file, index):
-    new_path = TEMP_DIR / f"{index:03}_{file.name}"
-    file.rename(new_path)
-    return new_path
+# ── per-chapter journal ────────────────────────────────────────────────────────
+# staging → converting   : originals are being moved into / sit in the stage;
+#                          a crash here is rolled back (originals put back)
+# committing             : the final NNN.webp renames are planned; a crash
+#                          here is rolled forward
+def write_journal(stage, journal):
+    tmp = stage / "journal.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(journal, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, stage / "journal.json")
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_journal(stage):
+    try:
+        with open(stage / "journal.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def claim_stage(manhwa_name, chapter, journal):
+    """Create the chapter's staging folder with its first journal entry.
+
+    The folder is filled under a private name and renamed into place, so a
+    stage never exists without a journal. ``None`` if another run holds it.
+    """
+    stage = STAGING_DIR / manhwa_name / chapter.name
+    tmp = stage.with_name(f".{chapter.name}.{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    write_journal(tmp, journal)
+    try:
+        tmp.rename(stage)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+    return stage
+
+def rollback_stage(stage, journal):
+    chapter = ROOT / journal["series"] / journal["chapter"]
+    for move in reversed(journal.get("moves", [])):
+        staged, original = stage / move["to"], chapter / move["from"]
+        if staged.exists() and not original.exists():
+            staged.rename(original)
+    shutil.rmtree(stage, ignore_errors=True)
 
-def convert_image(image_path, index_start, chapter_name):
+def commit_stage(stage, journal):
+    chapter = ROOT / journal["series"] / journal["chapter"]
+    for ren in journal["renames"]:
+        src = stage / ren["from"]
+        if src.exists():                       # already moved on an earlier try
+            src.rename(chapter / ren["to"])
+    fsync_path(chapter)                        # renames durable before the originals go
+    if journal.get("rejected"):
+        keep = REJECTED_DIR / journal["series"] / journal["chapter"]
+        keep.mkdir(parents=True, exist_ok=True)
+        for name in journal["rejected"]:
+            if (stage / name).exists():
+                (stage / name).rename(keep / name)
+    shutil.rmtree(stage, ignore_errors=True)
+
+def recover_stage(stage, journal):
+    if journal["state"] == "committing":
+        commit_stage(stage, journal)
+        log(f"♻️ RESUMED: {journal['series']} > {journal['chapter']}")
+        return True
+    rollback_stage(stage, journal)
+    log(f"↩️ ROLLED BACK: {journal['series']} > {journal['chapter']}")
+    return False
+
+def recover_all(library):
+    """Finish or undo every chapter a crashed run left half-converted."""
+    for tmp in STAGING_DIR.glob("*/.chapter-*"):   # claims that never got renamed
+        pid = tmp.name.rsplit(".", 1)[-1]
+        if pid.isdigit() and not pid_alive(int(pid)):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    for stage in sorted(p for p in STAGING_DIR.glob("*/chapter-*") if p.is_dir()):
+        journal = read_journal(stage)
+        if journal is None:
+            log(f"⚠️ UNREADABLE JOURNAL: {stage} – left untouched")
+            continue
+        if pid_alive(journal["pid"]):
+            continue                            # a parallel run is on it
+        recover_stage(stage, journal)
+        number = int(stage.name.split("-")[1])
+        chapter = library.update_chapter(journal["series"], number)
+        if chapter and not {"jpg", "jpeg", "png"} & set(chapter.formats):
+            library.mark(chapter, MARK)
+
+def convert_image(image_path, out_stem, chapter_name):
+    """Convert one image into ``<out_stem>_NN.webp`` slices; runs in a pool worker."""
     try:
-        img = Image.open(image_path).convert("RGB")
+        with Image.open(image_path) as probe:     # header only – nothing decoded yet
+            height = probe.height
+        if height <= MAX_HEIGHT:
+            img = Image.open(image_path).convert("RGB")
     except UnidentifiedImageError:
         log(f"❌ CORRUPT: {chapter_name} > {image_path.name}")
         return []
     except Exception as e:
         log(f"❌ ERROR: {chapter_name} > {image_path.name} ({e})")
         return []
+    if height > MAX_HEIGHT:
+        return split_image(image_path, out_stem, chapter_name)
 
-    width, height = img.size
-    count = 0
-    outputs = []
-
-    if height <= MAX_HEIGHT:
-        out_path = TEMP_DIR / f"converted_{index_start:03}.webp"
-        img.save(out_path, "webp")
-        outputs.append(out_path)
-        log(f"CONVERTED: {image_path.name} → {out_path.name}")
-        return outputs
+    out_path = out_stem.with_name(f"{out_stem.name}_00.webp")
+    img.save(out_path, "webp")
+    log(f"CONVERTED: {image_path.name} → {out_path.name}")
+    return [out_path]
 
+def split_image(image_path, out_stem, chapter_name):
+    # tall strips are decoded and encoded one slice at a time (iter_slices),
+    # so a 60k px page never sits in memory as one full RGB copy. Only a bad
+    # file is rejected; a full disk or MemoryError propagates and the chapter
+    # is rolled back instead
     log(f"SPLITTING: {image_path.name} too tall")
-    offset = 0
-    while offset < height:
-        slice_height = min(MAX_HEIGHT, height - offset)
-        part = img.crop((0, offset, width, offset + slice_height))
-        out_path = TEMP_DIR / f"converted_{index_start + count:03}.webp"
-        part.save(out_path, "webp")
-        log(f"SPLIT+CONVERTED: {image_path.name} → {out_path.name}")
-        outputs.append(out_path)
-        offset += slice_height
-        count += 1
-
-    return outputs
-
-def get_folder_size(path):
-    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    slices = iter_slices(image_path, MAX_HEIGHT)
+    outputs, complete = [], False
+    try:
+        while True:
+            try:
+                part = next(slices, None)
+            except (OSError, zlib.error) as e:
+                if getattr(e, "errno", None) is not None:
+                    raise                          # a real I/O error, not the image
+                log(f"❌ CORRUPT: {chapter_name} > {image_path.name} ({e})")
+                return []
+            if part is None:
+                complete = True
+                return outputs
+            out_path = out_stem.with_name(f"{out_stem.name}_{len(outputs):02}.webp")
+            outputs.append(out_path)
+            part.save(out_path, "webp")
+            del part                               # before the next slice is built
+            log(f"SPLIT+CONVERTED: {image_path.name} → {out_path.name}")
+    finally:
+        if not complete:
+            for out in outputs:
+                out.unlink(missing_ok=True)
+
+# ── conversion pool ────────────────────────────────────────────────────────────
+class ConvertPool:
+    """``ProcessPoolExecutor`` that is rebuilt when a worker dies.
+
+    One killed worker (OOM, a decoder crash) breaks every pending future of
+    the executor. Those images are retried one at a time in a single-worker
+    pool, so a second death names the image and only its chapter is rolled
+    back.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.suspects = []         # entries waiting for an isolated retry
+        self.solo = None           # (pool, entry) of the retry running now
+
+    def submit(self, entry):
+        try:
+            entry["future"] = self.pool.submit(convert_image, *entry["args"])
+        except BrokenProcessPool:
+            self.restart()
+            entry["future"] = self.pool.submit(convert_image, *entry["args"])
+        entry["pool"] = self.pool
+
+    def restart(self):
+        log("⚠️ WORKER DIED: restarting the conversion pool")
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def recover(self, jobs):
+        """Requeue images lost to a dead worker and start the next retry."""
+        broken = [e for j in jobs for e in j["entries"]
+                  if pool_died(e) and not e.get("isolated")]
+        if any(e["pool"] is self.pool for e in broken):    # not yet rebuilt by submit()
+            self.restart()
+        for entry in broken:
+            entry["future"] = Future()                     # pending until its retry runs
+            self.suspects.append(entry)
+
+        if self.suspects and (self.solo is None or self.solo[1]["future"].done()):
+            if self.solo:
+                self.solo[0].shutdown(wait=True)
+            entry = self.suspects.pop(0)
+            solo = ProcessPoolExecutor(max_workers=1)
+            entry["isolated"] = True
+            entry["future"] = solo.submit(convert_image, *entry["args"])
+            self.solo = (solo, entry)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+        if self.solo:
+            self.solo[0].shutdown(wait=True)
+
+def pool_died(entry):
+    future = entry["future"]
+    return (future is not None and future.done()
+            and isinstance(future.exception(), BrokenProcessPool))
 
 def format_size(size_bytes):
     return f"{size_bytes / (1024 ** 3):.2f} GB"
 
-def process_chapter(chapter, summary):
+def stage_chapter(chapter, manhwa_name, pool):
+    """Move a chapter's images into its staging folder and queue their conversion.
+
+    Every image is a separate pool task; the final ``NNN.webp`` numbering is
+    only assigned in :func:`finish_chapter`, in the original file order.
+    """
     files = get_image_files(chapter)
     if all(f.suffix.lower() == ".webp" for f in files):
         log(f"⏭️ SKIPPED: {chapter.name} (all files are .webp)")
-        return
+        return None
+
+    journal = {
+        "state": "staging", "pid": os.getpid(),
+        "series": manhwa_name, "chapter": chapter.name,
+        "moves": [{"from": f.name, "to": f"{i:03}_{f.name}"} for i, f in enumerate(files)],
+    }
+    stage = claim_stage(manhwa_name, chapter, journal)
+    if stage is None:
+        log(f"⏭️ BUSY: {chapter.name} (another run is converting it)")
+        return None
 
     log(f"\n📂 {chapter.name}")
-    before_size = get_folder_size(chapter)
-    summary["before"] += before_size
 
     working_list = []
-    for i, f in enumerate(files):
-        temp_path = move_to_temp(f, i)
+    for i, (f, move) in enumerate(zip(files, journal["moves"])):
+        staged = stage / move["to"]
+        f.rename(staged)
         ext = f.suffix.lower()
-        working_list.append({"original": temp_path, "type": ext})
+        entry = {"original": staged, "type": ext, "future": None,
+                 "args": (staged, stage / f"converted_{i:03}", chapter.name)}
+        if ext != ".webp":
+            pool.submit(entry)
+        working_list.append(entry)
+
+    journal["state"] = "converting"
+    write_journal(stage, journal)
+    return {"chapter": chapter, "stage": stage, "journal": journal, "entries": working_list}
 
-    index = 1
-    final_outputs = []
-    for entry in working_list:
+def chapter_done(job):
+    return all(e["future"] is None or e["future"].done() for e in job["entries"])
+
+def finish_chapter(job):
+    """Commit a converted chapter; ``False`` if it was rolled back instead."""
+    chapter, stage, journal = job["chapter"], job["stage"], job["journal"]
+    renames, rejected = [], []
+    for entry in job["entries"]:
         if entry["type"] == ".webp":
-            target = chapter / f"{index:03}.webp"
-            entry["original"].rename(target)
-            final_outputs.append(target.name)
-            index += 1
+            outputs = [entry["original"]]
         else:
-            outputs = convert_image(entry["original"], index, chapter.name)
-            for out in outputs:
-                target = chapter / f"{index:03}.webp"
-                out.rename(target)
-                final_outputs.append(target.name)
-                index += 1
+            try:
+                outputs = entry["future"].result()
+            except Exception as e:
+                # a worker error, or the image killed its worker even when run
+                # alone: keep the chapter as it was
+                log(f"❌ ERROR: {chapter.name} > {entry['original'].name} ({e})")
+                rollback_stage(stage, journal)
+                log(f"↩️ ROLLED BACK: {chapter.name}")
+                return False
+            if not outputs:
+                rejected.append(entry["original"].name)
+        for out in outputs:
+            renames.append({"from": out.name, "to": f"{len(renames) + 1:03}.webp"})
 
-    after_size = get_folder_size(chapter)
-    summary["after"] += after_size
+    # the originals are deleted with the stage once committed: outputs first
+    for ren in renames:
+        fsync_path(stage / ren["from"])
+    fsync_path(stage)
+    journal.update(state="committing", renames=renames, rejected=rejected)
+    write_journal(stage, journal)
+    commit_stage(stage, journal)
 
+    final_outputs = [r["to"] for r in renames]
     log(f"✅ Total .webp files: {len(final_outputs)}")
     log(f"📄 Files: {', '.join(final_outputs)}")
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert the library to .webp.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="conversion processes (default: one per core)")
+    args = parser.parse_args()
+
     if not MANHWA_LIST_JSON.exists():
         print(f"File not found: {MANHWA_LIST_JSON}")
         sys.exit(1)
@@ -120,21 +340,75 @@ def main():
         manhwa_list = json.load(f)
 
     summary_list = []
+    library = open_library(ROOT)
+    max_in_flight = args.workers * 4      # image tasks queued ahead of the pool
+    jobs = []                             # staged chapters still converting
+    progress = {"chapters": 0, "images": 0, "started": time.time()}
 
-    for manhwa_name in sorted(manhwa_list.keys()):
-        base = ROOT / manhwa_name
-        if not base.exists():
-            log(f"🚫 MISSING: {base}")
-            continue
+    recover_all(library)
+
+    def finish_ready(block):
+        pool.recover(jobs)            # before the wait: a queued retry must be running
+        if block:
+            busy = [e["future"] for j in jobs for e in j["entries"]
+                    if e["future"] is not None and not e["future"].done()]
+            wait(busy, return_when=FIRST_COMPLETED)
+            pool.recover(jobs)
+        for job in [j for j in jobs if chapter_done(j)]:
+            jobs.remove(job)
+            finish_chapter(job)
+            after = library.update_chapter(job["series"], job["number"])
+            job["summary"]["after"] += after.bytes if after else 0
+            if after and not {"jpg", "jpeg", "png"} & set(after.formats):
+                library.mark(after, MARK)
+            progress["chapters"] += 1
+            progress["images"] += len(job["entries"])
+            rate = progress["images"] / max(time.time() - progress["started"], 1e-6)
+            log(f"📈 {progress['chapters']} chapters, {progress['images']} images "
+                f"({rate:.1f} img/s)")
+
+    def in_flight():
+        return sum(1 for j in jobs for e in j["entries"]
+                   if e["future"] is not None and not e["future"].done())
+
+    pool = ConvertPool(args.workers)
+    try:
+        for manhwa_name in sorted(manhwa_list.keys()):
+            base = ROOT / manhwa_name
+            if not base.exists():
+                log(f"🚫 MISSING: {base}")
+                continue
+
+            log(f"\n=== STARTING: {manhwa_name} ===")
+            summary = {"name": manhwa_name, "before": 0, "after": 0}
+            summary_list.append(summary)
 
-        log(f"\n=== STARTING: {manhwa_name} ===")
-        summary = {"name": manhwa_name, "before": 0, "after": 0}
+            for info in library.chapters(manhwa_name):
+                # a mark is only valid for the folder state it was made for
+                if library.is_marked(info, MARK):
+                    continue
+                if not {"jpg", "jpeg", "png"} & set(info.formats):
+                    log(f"⏭️ SKIPPED: {info.dir_name} (all files are .webp)")
+                    library.mark(info, MARK)
+                    continue
+                # sizes come from the index: before = stored row, after = rescan
+                summary["before"] += info.bytes
+                job = stage_chapter(base / info.dir_name, manhwa_name, pool)
+                if job is None:
+                    after = library.update_chapter(manhwa_name, info.number)
+                    summary["after"] += after.bytes if after else 0
+                    continue
+                job.update(series=manhwa_name, number=info.number, summary=summary)
+                jobs.append(job)
 
-        for chapter in sorted(base.glob("chapter-*"), key=lambda x: int(x.name.split("-")[-1])):
-            if chapter.is_dir():
-                process_chapter(chapter, summary)
+                finish_ready(block=False)
+                while in_flight() > max_in_flight:
+                    finish_ready(block=True)
 
-        summary_list.append(summary)
+        while jobs:
+            finish_ready(block=True)
+    finally:
+        pool.shutdown()
 
     log("\n====== FINAL SUMMARY ======")
     for s in summary_list:
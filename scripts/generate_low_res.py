@@ -1,7 +1,12 @@
 import os
+import sys
 from PIL import Image, ImageFilter
 from tqdm import tqdm
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.library_index import open_library
+
 # === Paths ===
 source_root = "/home/ubuntu/backend/pictures"
 target_root = "/home/ubuntu/backend/picturesLow"
@@ -46,9 +51,32 @@ def process_image(source_path, target_path):
 
 # === Walk and process ===
 def walk_and_process():
-    all_images = []
-
+    library = open_library(source_root)
+    library.refresh()
+
+    pending = []   # (chapter or None, [(source_file, target_file), ...])
+    indexed = set()
+    for series in library.all_series():
+        for chapter in library.chapters(series, refresh=False):
+            source_dir = os.path.join(source_root, series, chapter.dir_name)
+            indexed.add(source_dir)
+            if library.is_marked(chapter, "lowres"):
+                continue
+
+            target_dir = os.path.join(target_root, series, chapter.dir_name)
+            os.makedirs(target_dir, exist_ok=True)
+            done = set(os.listdir(target_dir))
+
+            pending.append((chapter, [
+                (os.path.join(source_dir, f), os.path.join(target_dir, f))
+                for f in chapter.files if f not in done
+            ]))
+
+    # Everything outside the indexed chapter folders (covers, other folders)
+    # is still walked, as before the index existed.
+    loose = []
     for root, dirs, files in os.walk(source_root):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in indexed]
         relative_path = os.path.relpath(root, source_root)
         target_dir = os.path.join(target_root, relative_path)
         os.makedirs(target_dir, exist_ok=True)
@@ -59,12 +87,19 @@ def walk_and_process():
                 target_file = os.path.join(target_dir, file)
 
                 if not os.path.exists(target_file):
-                    all_images.append((source_file, target_file))
+                    loose.append((source_file, target_file))
+    pending.append((None, loose))
 
+    all_images = [pair for _, pairs in pending for pair in pairs]
     log(f"🔍 Found {len(all_images)} new images to process...")
 
-    for source_file, target_file in tqdm(all_images, desc="Processing images", unit="img"):
-        process_image(source_file, target_file)
+    with tqdm(total=len(all_images), desc="Processing images", unit="img") as bar:
+        for chapter, pairs in pending:
+            for source_file, target_file in pairs:
+                process_image(source_file, target_file)
+                bar.update(1)
+            if chapter is not None:
+                library.mark(chapter, "lowres")
 
 # === Entry point ===
 if __name__ == "__main__":
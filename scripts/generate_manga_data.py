@@ -1,7 +1,12 @@
 import os
+import sys
 import json
 from datetime import datetime
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.library_index import open_library
+
 # === CONFIG ===
 mawha_base_path = "/home/ubuntu/backend/pictures"
 base_output_dir = "/home/ubuntu/backend/data/jsonFiles"
@@ -18,21 +23,17 @@ else:
 # === Ensure output dir exists ===
 os.makedirs(base_output_dir, exist_ok=True)
 
-# === Scan manhwa folders ===
-for manhwa_name in os.listdir(mawha_base_path):
-    manhwa_path = os.path.join(mawha_base_path, manhwa_name)
-    if not os.path.isdir(manhwa_path):
-        continue
+# === Scan manhwa folders (via the library index) ===
+library = open_library(mawha_base_path)
+library.refresh()
 
+for manhwa_name in library.all_series():
     manhwa_output_dir = os.path.join(base_output_dir, manhwa_name)
     os.makedirs(manhwa_output_dir, exist_ok=True)
 
     # === Get chapters ===
-    chapter_folders = sorted(
-        [f for f in os.listdir(manhwa_path) if f.startswith("chapter-")],
-        key=lambda x: int(x.replace("chapter-", ""))
-    )
-    chapters_amount = max([int(f.replace("chapter-", "")) for f in chapter_folders], default=0)
+    chapters = library.chapters(manhwa_name, refresh=False)
+    chapters_amount = max([c.number for c in chapters], default=0)
 
     # === Get details or fallback ===
     details = manwha_details.get(manhwa_name, {})
@@ -51,21 +52,17 @@ for manhwa_name in os.listdir(mawha_base_path):
     }
 
     # === Process chapters ===
-    for chapter_folder in chapter_folders:
-        chapter_path = os.path.join(manhwa_path, chapter_folder)
-        if not os.path.isdir(chapter_path):
-            continue
-
-        image_files = sorted([
-            f for f in os.listdir(chapter_path)
+    for chapter in chapters:
+        chapter_folder = chapter.dir_name
+        image_files = [
+            f for f in chapter.files
             if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))
-        ])
-        stat = os.stat(chapter_path)
-        mod_time = datetime.fromtimestamp(stat.st_mtime)
+        ]
+        mod_time = datetime.fromtimestamp(chapter.mtime)
         time_str = mod_time.strftime("%H:%M %d/%m/%Y")
 
         description["uploadTime"].append({
-            "chapter": int(chapter_folder.replace("chapter-", "")),
+            "chapter": chapter.number,
             "time": time_str
         })
 
@@ -0,0 +1,36 @@
+import os
+import sys
+import argparse
+from time import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.common.config import PICTURES_BASE
+from functions.common.library_index import open_library
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the pictures library index.")
+    parser.add_argument("command", choices=["refresh", "reconcile", "stats"],
+                        help="refresh = incremental, reconcile = full rescan")
+    parser.add_argument("--root", default=PICTURES_BASE)
+    args = parser.parse_args()
+
+    start   = time()
+    library = open_library(args.root)
+
+    if args.command == "refresh":
+        library.refresh()
+    elif args.command == "reconcile":
+        library.reconcile()
+
+    series   = library.all_series()
+    chapters = [c for s in series for c in library.chapters(s, refresh=False)]
+    total    = library.total_bytes()
+    print(f"📚  {len(series)} series, {len(chapters)} chapters, "
+          f"{sum(c.pages for c in chapters)} pages, {total / 1024 ** 3:.2f} GB")
+    print(f"⏱️  {args.command} finished in {time() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pathlib import Path
+import argparse
 import sys
 
 
@@ -6,30 +7,53 @@ project_root = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(project_root))
 
 from functions.searchNewChapters import config, checker, logger
+from functions.searchNewChapters.http_cache import cache
+
+
+def report(series_name: str, entry: dict, local: int | None, online: int | None) -> bool:
+    if online and (local is None or online > local):
+        logger.log_new_chapter(series_name, entry.get("site"), local, online)
+        return True
+
+    online_txt = "❌ error" if online is None else online
+    print(
+        f"✅ {entry.get('site')} - {series_name}: "
+        f"No new chapter (Local: {local}, Online: {online_txt})"
+    )
+    return False
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="check all series concurrently")
+    args = parser.parse_args()
+
     manhwa_list = config.load_manhwa_list()
     new_found = False
 
+    jobs = []
     for series_name, entries in manhwa_list.items():
         folder_path = Path(config.pictures_path) / series_name
         folder_path.mkdir(parents=True, exist_ok=True)
 
         for entry in entries:
             entry["folder_path"] = str(folder_path)          # pass to checker
+            jobs.append((series_name, entry))
+
+    if args.use_async:
+        results = checker.check_all(jobs)
+        for (series_name, entry), (local, online) in zip(jobs, results):
+            new_found |= report(series_name, entry, local, online)
+    else:
+        for series_name, entry in jobs:
             local, online = checker.check_online_chapter(series_name, entry)
-
-            if online and (local is None or online > local):
-                logger.log_new_chapter(series_name, entry.get("site"), local, online)
-                new_found = True
-            else:
-                online_txt = "❌ error" if online is None else online
-                print(
-                    f"✅ {entry.get('site')} - {series_name}: "
-                    f"No new chapter (Local: {local}, Online: {online_txt})"
-                )
+            new_found |= report(series_name, entry, local, online)
 
     if not new_found:
         logger.log_no_new_chapters()
 
-    config.save_manhwa_list(manhwa_list)
\ No newline at end of file
+    config.save_manhwa_list(manhwa_list)
+
+    cache.report()
+    cache.evict()